@@ -0,0 +1,391 @@
+"""
+Local stand-in for the Oracle EBS supplier portal, for offline benchmarks.
+
+Serves synthetic pages with the same structure and selectors the scrapers
+rely on (engine.py, scrapper.py, status_scrapper.py, http_scraper.py):
+
+    /OA_HTML/AppsLocalLogin.jsp        login form (input#usernameField, "Log In")
+    /OA_HTML/OA.jsp?page=home          img[title='Expand'], "Home Page", "Orders"
+    /OA_HTML/OA.jsp?page=orders&start  span#ResultRN1 table, 13 columns, "Next 25" / "Next N"
+    /OA_HTML/OA.jsp?page=search        Advanced Search (input#Value_0, Go button)
+    /OA_HTML/OA.jsp?page=results&po    table#ResultRN.PosVpoPoList:Content
+    /OA_HTML/OA.jsp?page=po&po         PosOrderDateTime span + line items table
+    /static/...                        stylesheet, image, font and a third-party script
+    /__stats__                         request counters as JSON (not counted)
+
+Pages other than the login form require the session cookie set by the login
+POST; without it the login form is served, like the ERP does for an expired
+session. With --expire-links the PO links of the Orders list carry a stale
+transaction id and serve the login form too, so every detail goes through
+the Advanced Search fallback. Page latency, asset latency and page sizes are
+configurable:
+
+    python -m benchmarks.erp_standin --port 8800 --pos 200 --latency-ms 150
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import subprocess
+from urllib.request import urlopen
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+SESSION_COOKIE = "JSESSIONID"
+LOGIN_PATH = "/OA_HTML/AppsLocalLogin.jsp"
+OA_PATH = "/OA_HTML/OA.jsp"
+STATS_PATH = "/__stats__"
+PAGE_SIZE = 25
+
+ORDERS_HEADERS = [
+    "PO Number", "Rev", "Operating Unit", "Description", "Buyer", "Order Date",
+    "Currency", "Amount", "Ship-To", "Bill-To", "Acknowledge By", "Supplier Site", "Status",
+]
+STATUSES = ["Open", "Approved", "Requires Acknowledgment", "Closed For Invoicing", "Closed"]
+# Detail table headers at the positions of table_extract.DETAIL_COLUMNS
+DETAIL_HEADERS = {2: "Line", 4: "Item/Job", 6: "Description", 8: "Qty", 9: "Price", 25: "Site ID", 27: "Project Name"}
+DETAIL_WIDTH = 28
+
+class StandinConfig:
+    def __init__(self, pos=75, lines=5, latency_ms=50, jitter_ms=20, asset_latency_ms=20,
+                 padding_kb=0, asset_kb=50, seed=1, expire_links=False):
+        self.pos = pos
+        self.lines = lines
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.asset_latency_ms = asset_latency_ms
+        self.padding_kb = padding_kb
+        self.asset_kb = asset_kb
+        self.seed = seed
+        self.expire_links = expire_links
+
+    def to_args(self):
+        """Command line options of `python -m benchmarks.erp_standin` for this configuration."""
+        args = [
+            "--pos", self.pos, "--lines", self.lines, "--latency-ms", self.latency_ms,
+            "--jitter-ms", self.jitter_ms, "--asset-latency-ms", self.asset_latency_ms,
+            "--padding-kb", self.padding_kb, "--asset-kb", self.asset_kb, "--seed", self.seed,
+        ]
+        return [str(arg) for arg in args] + (["--expire-links"] if self.expire_links else [])
+
+def po_number(index):
+    return str(4500000000 + index)
+
+def _order_date(index):
+    return f"{(index % 28) + 1:02d}-{['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN'][index % 6]}-2025"
+
+def _page(config, title, body, third_party_host):
+    padding = f"<div style='display:none'>{'x' * (config.padding_kb * 1024)}</div>" if config.padding_kb else ""
+    return f"""<!DOCTYPE html>
+<html><head><title>{title}</title>
+<link rel="stylesheet" href="/static/app.css">
+<style>@font-face {{ font-family: Oracle; src: url(/static/oracle.woff2); }} body {{ font-family: Oracle; }}</style>
+<script src="http://{third_party_host}/static/track.js"></script>
+</head><body>
+<img src="/static/logo.png" width="120" height="30" alt="logo">
+{body}
+{padding}
+</body></html>"""
+
+def login_body():
+    return f"""
+<form method="post" action="{OA_PATH}?page=login">
+  <input id="usernameField" name="usernameField" type="text">
+  <input id="passwordField" name="passwordField" type="password">
+  <button type="submit">Log In</button>
+</form>"""
+
+def nav():
+    return f'<div><a href="{OA_PATH}?page=orders">Orders</a></div>'
+
+def home_body():
+    return f"""
+<img title="Expand" src="/static/expand.gif" width="16" height="16"
+     onclick="document.getElementById('menu').style.display='block'">
+<ul id="menu"><li><a href="{OA_PATH}?page=home">Home Page</a></li></ul>
+{nav()}"""
+
+def orders_body(config, start, base_url):
+    rows = ["<tr>" + "".join(f"<th>{h}</th>" for h in ORDERS_HEADERS) + "</tr>"]
+    # An expired deep link still carries the transaction id of an older session
+    stale = "&amp;_ti=1" if config.expire_links else ""
+    for index in range(start, min(start + PAGE_SIZE, config.pos)):
+        number = po_number(index)
+        cells = [""] * len(ORDERS_HEADERS)
+        cells[0] = f'<a href="{base_url}{OA_PATH}?page=po&amp;po={number}{stale}">{number}</a>'
+        cells[1] = str(index % 3)
+        cells[3] = f"Supply order {index}"
+        cells[5] = _order_date(index)
+        cells[12] = STATUSES[index % len(STATUSES)]
+        rows.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+    next_link = ""
+    if start + PAGE_SIZE < config.pos:
+        # Like the ERP, the link names the size of the next page: "Next 25", or fewer before the last one
+        label = f"Next {min(PAGE_SIZE, config.pos - start - PAGE_SIZE)}"
+        next_link = f'<a class="x49" title="{label}" href="{OA_PATH}?page=orders&amp;start={start + PAGE_SIZE}">{label}</a>'
+    return f"""{nav()}
+<button id="SrchBtn" title="Advanced Search" onclick="location.href='{OA_PATH}?page=search'">Advanced Search</button>
+<span id="ResultRN1"><table><tbody>{''.join(rows)}</tbody></table></span>
+{next_link}"""
+
+def search_body():
+    return f"""{nav()}
+<form method="get" action="{OA_PATH}">
+  <input type="hidden" name="page" value="results">
+  <input id="Value_0" name="po" type="text">
+  <button id="customizeSubmitButton" type="submit">Go</button>
+</form>"""
+
+def results_body(config, number):
+    rows = ""
+    if number.isdigit() and 0 <= int(number) - 4500000000 < config.pos:
+        rows = (f'<tr><td><a id="N3:PosPoNumber:0" href="{OA_PATH}?page=po&amp;po={escape(number)}">'
+                f'{escape(number)}</a></td></tr>')
+    return f"""{nav()}
+<table id="ResultRN.PosVpoPoList:Content"><tbody>{rows}</tbody></table>"""
+
+def detail_body(config, number):
+    index = int(number) - 4500000000
+    header = "".join(f"<th>{DETAIL_HEADERS.get(i, f'Col {i}')}</th>" for i in range(DETAIL_WIDTH))
+    rows = []
+    for line in range(1, config.lines + 1):
+        cells = [""] * DETAIL_WIDTH
+        cells[2] = str(line)
+        cells[4] = f"ITEM-{index}-{line}"
+        cells[6] = f"Line {line} of PO {number}"
+        cells[8] = str(line * 2)
+        cells[9] = f"{100 + line}.00"
+        cells[25] = f"SITE{(index + line) % 40:03d}"
+        cells[27] = f"PRJ{index % 12:02d}"
+        rows.append("<tr>" + "".join(f"<td>{c}</td>" for c in cells) + "</tr>")
+    return f"""{nav()}
+<span id="PosOrderDateTime">{_order_date(index)} 10:00:00</span>
+<table><thead><tr>{header}</tr></thead><tbody>{''.join(rows)}</tbody></table>"""
+
+def make_handler(config, stats):
+    sessions = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _delay(self, ms):
+            jitter = random.uniform(0, config.jitter_ms) if config.jitter_ms else 0
+            if ms or jitter:
+                time.sleep((ms + jitter) / 1000)
+
+        def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+            data = body if isinstance(body, bytes) else body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            with lock:
+                stats["requests"] += 1
+                stats["bytes"] += len(data)
+
+        def _session(self):
+            for part in self.headers.get("Cookie", "").split(";"):
+                name, _, value = part.strip().partition("=")
+                if name == SESSION_COOKIE and value in sessions:
+                    return value
+            return None
+
+        def _third_party_host(self):
+            # Same server under another host name, so it counts as third party
+            host, _, port = self.headers.get("Host", "127.0.0.1").partition(":")
+            return f"{'localhost' if host != 'localhost' else '127.0.0.1'}:{port}"
+
+        def _html(self, title, body):
+            self._send(200, _page(config, title, body, self._third_party_host()))
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path.startswith("/static/"):
+                return self._static(url.path)
+            if url.path == STATS_PATH:
+                with lock:
+                    data = json.dumps(stats).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self._delay(config.latency_ms)
+            if url.path == LOGIN_PATH:
+                return self._html("Login", login_body())
+            if url.path != OA_PATH:
+                return self._send(404, "not found", "text/plain")
+            if not self._session():
+                return self._html("Login", login_body())
+
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            page = query.get("page", "home")
+            base_url = f"http://{self.headers.get('Host')}"
+            if page == "orders":
+                return self._html("Orders", orders_body(config, int(query.get("start", 0)), base_url))
+            if page == "search":
+                return self._html("Advanced Search", search_body())
+            if page == "results":
+                return self._html("Search Results", results_body(config, query.get("po", "")))
+            if page == "po" and query.get("po", "").isdigit():
+                if config.expire_links and "_ti" in query:
+                    with lock:
+                        stats["expired_links"] += 1
+                    return self._html("Login", login_body())
+                with lock:
+                    stats["details"] += 1
+                return self._html("Purchase Order", detail_body(config, query["po"]))
+            return self._html("Home", home_body())
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._delay(config.latency_ms)
+            session = f"{random.getrandbits(64):016x}"
+            with lock:
+                sessions.add(session)
+                stats["logins"] += 1
+            self._send(302, "", headers={
+                "Location": f"{OA_PATH}?page=home",
+                "Set-Cookie": f"{SESSION_COOKIE}={session}; Path=/",
+            })
+
+        def _static(self, path):
+            self._delay(config.asset_latency_ms)
+            size = config.asset_kb * 1024
+            if path.endswith(".css"):
+                return self._send(200, "/*" + "x" * size + "*/", "text/css")
+            if path.endswith(".js"):
+                return self._send(200, "//" + "x" * size, "application/javascript")
+            if path.endswith(".woff2"):
+                return self._send(200, b"\0" * size, "font/woff2")
+            return self._send(200, b"\0" * size, "image/png")
+
+    return Handler
+
+class ERPStandin:
+    """Runs the stand-in on a background thread: `with ERPStandin(config) as erp: erp.login_url`."""
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StandinConfig()
+        random.seed(self.config.seed)
+        self.stats = {"requests": 0, "bytes": 0, "logins": 0, "details": 0, "expired_links": 0}
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def login_url(self):
+        return self.base_url + LOGIN_PATH
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+class ERPStandinProcess:
+    """
+    Runs the stand-in in a child process, so serving pages does not compete
+    with the scraper for the GIL and its memory stays out of the scraper's RSS.
+    Same interface as ERPStandin; `stats` is fetched from the child.
+    """
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StandinConfig()
+        self.host = host
+        self.port = port
+        self.process = None
+        self.base_url = None
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    @property
+    def login_url(self):
+        return self.base_url + LOGIN_PATH
+
+    @property
+    def stats(self):
+        with urlopen(self.base_url + STATS_PATH) as response:
+            return json.load(response)
+
+    def start(self):
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.erp_standin", "--host", self.host, "--port", str(self.port),
+             *self.config.to_args()],
+            cwd=project_root, stdout=subprocess.PIPE, text=True,
+        )
+        # The child prints its login URL once it is listening
+        line = self.process.stdout.readline()
+        if not line.startswith("ERP stand-in on "):
+            self.stop()
+            raise RuntimeError(f"ERP stand-in failed to start: {line!r}")
+        self.base_url = line.split(" on ", 1)[1].strip()[:-len(LOGIN_PATH)]
+        return self
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main():
+    defaults = StandinConfig()
+    parser = argparse.ArgumentParser(description="Local ERP stand-in for scraper benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800, help="0 picks a free port")
+    parser.add_argument("--pos", type=int, default=defaults.pos)
+    parser.add_argument("--lines", type=int, default=defaults.lines)
+    parser.add_argument("--latency-ms", type=int, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=int, default=defaults.jitter_ms)
+    parser.add_argument("--asset-latency-ms", type=int, default=defaults.asset_latency_ms)
+    parser.add_argument("--asset-kb", type=int, default=defaults.asset_kb)
+    parser.add_argument("--padding-kb", type=int, default=defaults.padding_kb)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--expire-links", action="store_true", help="PO links of the Orders list serve the login form")
+    args = parser.parse_args()
+    config = StandinConfig(pos=args.pos, lines=args.lines, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           asset_latency_ms=args.asset_latency_ms, asset_kb=args.asset_kb,
+                           padding_kb=args.padding_kb, seed=args.seed, expire_links=args.expire_links)
+    standin = ERPStandin(config, host=args.host, port=args.port)
+    print(f"ERP stand-in on {standin.login_url}", flush=True)
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        standin.stop()
+
+if __name__ == "__main__":
+    main()
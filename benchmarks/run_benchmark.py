@@ -0,0 +1,189 @@
+"""
+Offline scraper benchmark against the local ERP stand-in (erp_standin.py).
+
+Runs the real scheduled jobs (scrape_indus_po_data, scrape_and_store_in_redis
+and scrape_orders_combined) end to end with their engine pointed at the
+stand-in, and reports per scenario: POs per minute, the time spent in each
+scraping stage as recorded by the metrics spans (login, navigation,
+pagination, detail, extraction, redis_write; summed over concurrent tasks)
+and the peak RSS of this process and its Chromium children. The stand-in runs
+in a child process of its own, which is left out of the RSS. --expire-links
+makes every direct PO link stale, to measure the Advanced Search fallback.
+
+    python -m benchmarks.run_benchmark --pos 150 --latency-ms 100 --workers 1,4
+    python -m benchmarks.run_benchmark --scrapers po --modes browser,http --json bench.json
+    python -m benchmarks.run_benchmark --scrapers po --expire-links
+
+The scrapers write to Redis as usual. The benchmark uses its own database
+(--redis-db, default 15), FLUSHES it before every scenario and once it is done,
+and refuses to start when that database is not empty.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from functools import partial
+
+from indusproject import metrics, redis_connection
+from indusproject.redis_connection import get_redis
+from indusproject.browser_pool import process_tree_rss_mb
+from indusproject.browser_profile import ScrapeProfile
+from indusproject.engine import ERPEngine
+from indusproject.po_store import count_records
+from indusproject.status_store import PO_STATUS_KEY
+from indusproject.status_scrapper import ScraperConfig, scrape_and_store_in_redis
+from indusproject.scrapper import scrape_indus_po_data, scrape_orders_combined
+from benchmarks.erp_standin import ERPStandinProcess, StandinConfig
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ERP scraper benchmark")
+    parser.add_argument("--scrapers", default="po,status,combined", help="po, status, combined")
+    parser.add_argument("--modes", default="browser", help="browser, http")
+    parser.add_argument("--workers", default="1,4", help="detail concurrency levels to run (po and combined)")
+    parser.add_argument("--pos", type=int, default=75, help="POs listed by the stand-in")
+    parser.add_argument("--lines", type=int, default=5, help="line items per PO")
+    parser.add_argument("--latency-ms", type=int, default=50, help="latency of every ERP page")
+    parser.add_argument("--asset-latency-ms", type=int, default=20, help="latency of images, styles, fonts, scripts")
+    parser.add_argument("--asset-kb", type=int, default=50, help="size of every static asset")
+    parser.add_argument("--padding-kb", type=int, default=0, help="extra HTML per page")
+    parser.add_argument("--expire-links", action="store_true", help="direct PO links are stale (search fallback)")
+    parser.add_argument("--no-blocking", action="store_true", help="load every resource (no request filtering)")
+    parser.add_argument("--redis-db", type=int, default=15, help="must be empty, it is flushed")
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+# ================= MEASUREMENT =================
+STAGE_SUM_RE = re.compile(r'^scraper_stage_seconds_sum\{stage="([^"]+)"\}$')
+
+def stage_seconds():
+    """Total seconds per scraping stage recorded in Redis by the metrics spans."""
+    metrics.flush()
+    stages = {}
+    for field, value in get_redis().hgetall(metrics.HISTOGRAMS_KEY).items():
+        match = STAGE_SUM_RE.match(field.decode())
+        if match:
+            stages[match.group(1)] = float(value)
+    return dict(sorted(stages.items()))
+
+class PeakRSS:
+    """Samples the RSS of this process tree (scraper and Chromium) in a thread, minus the `exclude_pid` subtree."""
+    def __init__(self, exclude_pid=None, interval=0.2):
+        self.exclude_pid = exclude_pid
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            excluded = process_tree_rss_mb(self.exclude_pid) or 0.0
+            self.peak_mb = max(self.peak_mb, (process_tree_rss_mb(os.getpid()) or 0.0) - excluded)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+# ================= SCENARIOS =================
+def engine_factory(standin):
+    return partial(ERPEngine, login_url=standin.login_url, username="benchmark", password="benchmark")
+
+def bench_po(standin, profile, mode, workers):
+    scrape_indus_po_data(max_pages=None, workers=workers, mode=mode, incremental=False,
+                         profile=profile, engine_factory=engine_factory(standin))
+    return count_records()
+
+def bench_status(standin, profile, mode, workers):
+    config = ScraperConfig()
+    config.base_url = standin.login_url
+    config.email = config.password = "benchmark"
+    config.mode = mode
+    config.profile = profile
+    scrape_and_store_in_redis(config)
+    return get_redis().hlen(PO_STATUS_KEY)
+
+def bench_combined(standin, profile, mode, workers):
+    scrape_orders_combined(workers=workers, mode=mode, profile=profile, engine_factory=engine_factory(standin))
+    return get_redis().hlen(PO_STATUS_KEY)
+
+SCENARIOS = {"po": bench_po, "status": bench_status, "combined": bench_combined}
+
+def run_scenario(name, standin, profile, mode, workers):
+    get_redis().flushdb()
+    before = standin.stats
+    with PeakRSS(exclude_pid=standin.pid) as rss:
+        started = time.perf_counter()
+        pos = SCENARIOS[name](standin, profile, mode, workers)
+        elapsed = time.perf_counter() - started
+    after = standin.stats
+    served = {k: after[k] - before[k] for k in after}
+    return {
+        "scenario": name,
+        "mode": mode,
+        "workers": workers,
+        "pos": pos,
+        "seconds": round(elapsed, 2),
+        "pos_per_minute": round(pos / elapsed * 60, 1) if elapsed else 0.0,
+        "stages": {stage: round(seconds, 2) for stage, seconds in stage_seconds().items()},
+        "peak_rss_mb": round(rss.peak_mb, 1),
+        "requests": served["requests"],
+        "kb_served": round(served["bytes"] / 1024, 1),
+        "expired_links": served["expired_links"],
+    }
+
+def print_report(results):
+    print()
+    print(f"{'scenario':<10} {'mode':<8} {'workers':>7} {'POs':>5} {'secs':>7} {'POs/min':>8} {'peak MB':>8} {'reqs':>6} {'KB':>9} {'expired':>7}  stages (s)")
+    for r in results:
+        stages = ", ".join(f"{k} {v}" for k, v in r["stages"].items())
+        print(f"{r['scenario']:<10} {r['mode']:<8} {r['workers']:>7} {r['pos']:>5} {r['seconds']:>7} "
+              f"{r['pos_per_minute']:>8} {r['peak_rss_mb']:>8} {r['requests']:>6} {r['kb_served']:>9} {r['expired_links']:>7}  {stages}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Before the first connection is made, so every scenario uses the benchmark database
+    redis_connection.REDIS_DB = args.redis_db
+    keys = get_redis().dbsize()
+    if keys:
+        print(f"[BENCH] Redis database {args.redis_db} holds {keys} keys and would be flushed; "
+              f"pass --redis-db with an empty database")
+        return 2
+    config = StandinConfig(
+        pos=args.pos, lines=args.lines, latency_ms=args.latency_ms,
+        asset_latency_ms=args.asset_latency_ms, asset_kb=args.asset_kb, padding_kb=args.padding_kb,
+        expire_links=args.expire_links,
+    )
+    profile = ScrapeProfile(blocked_types=(), block_third_party=False) if args.no_blocking else ScrapeProfile()
+    scrapers = [s for s in args.scrapers.split(",") if s]
+    modes = [m for m in args.modes.split(",") if m]
+    worker_levels = [int(w) for w in args.workers.split(",") if w]
+
+    results = []
+    try:
+        with ERPStandinProcess(config) as standin:
+            print(f"[BENCH] ERP stand-in on {standin.login_url}, {config.pos} POs, {config.latency_ms}ms per page")
+            for name in scrapers:
+                for mode in modes:
+                    # The status job scrapes no details, so the worker count does not apply
+                    for workers in (worker_levels if name != "status" else [1]):
+                        print(f"[BENCH] {name} / {mode} / {workers} workers")
+                        results.append(run_scenario(name, standin, profile, mode, workers))
+    finally:
+        # Leave the database empty, so the next run's check passes
+        get_redis().flushdb()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
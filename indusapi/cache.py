@@ -0,0 +1,105 @@
+"""
+Per-worker cache of rendered API responses, keyed on the dataset version.
+
+The scheduled jobs bump a version counter next to each dataset whenever they
+write it (see po_store.PO_VERSION_KEY and status_store.PO_STATUS_VERSION_KEY).
+A request first reads that counter with one GET; if the client already has the
+current representation (If-None-Match) it gets a 304, and otherwise the
+pre-rendered body for (version, request parameters) is served from memory.
+Only a cache miss decodes Redis data and renders JSON.
+
+Only bodies of the current version are kept: the first entry of a newer version
+drops all others. The cache is bounded by MAX_ENTRIES and MAX_BYTES, and bodies
+larger than MAX_ENTRY_BYTES (e.g. an unpaginated full dataset) are never cached,
+so a worker's memory stays flat however often the data changes.
+"""
+import os, hashlib, json, threading
+from collections import OrderedDict
+from django.http import HttpResponse, HttpResponseNotModified
+from indusproject.redis_connection import get_redis
+
+MAX_ENTRIES = 256
+MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+MAX_ENTRY_BYTES = int(os.getenv("API_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+def _version_order(version):
+    return int(version) if version.isdigit() else -1
+
+class VersionedResponseCache:
+    def __init__(self, name, version_key, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 max_entry_bytes=MAX_ENTRY_BYTES):
+        self.name = name
+        self.version_key = version_key
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._version = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def current_version(self):
+        raw = get_redis().get(self.version_key)
+        return raw.decode() if raw else "0"
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """Caches `entry` (body, status) under key (version, digest), unless it is too large or stale."""
+        version, size = key[0], len(entry[0])
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                if self._version is not None and _version_order(version) < _version_order(self._version):
+                    return  # rendered from a version that has since been replaced
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (body, _) = self._entries.popitem(last=False)
+                self._bytes -= len(body)
+
+def _params_digest(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+def cached_json_response(request, cache, params, render):
+    """
+    Serves `render()` -> (payload, status) through `cache`. The ETag combines the
+    dataset version with the request parameters, so it changes exactly when the
+    response would.
+    """
+    version = cache.current_version()
+    digest = _params_digest(params)
+    etag = f'"{cache.name}-{version}-{digest}"'
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    key = (version, digest)
+    entry = cache.get(key)
+    if entry is None:
+        payload, status = render()
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+        entry = (body, status)
+        cache.put(key, entry)
+
+    body, status = entry
+    response = HttpResponse(body, status=status, content_type="application/json")
+    response["ETag"] = etag
+    return response
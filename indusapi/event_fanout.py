@@ -0,0 +1,86 @@
+"""
+Process-wide fan-out of the scrapers' pub/sub events to SSE clients.
+
+Each event loop (one per ASGI worker) holds a single Redis subscription to
+EVENTS_CHANNEL, read by one background task that puts every event on the
+queue of each connected client. The number of Redis connections therefore
+stays at one per worker however many clients are streaming, instead of one
+per client out of the shared async pool.
+
+A client whose queue is full (it stopped reading) is dropped: its stream ends
+and the browser reconnects after the SSE `retry` delay.
+"""
+import json, asyncio, weakref
+from indusproject.redis_connection import get_async_redis
+from indusproject.events import EVENTS_CHANNEL
+
+CLIENT_QUEUE_SIZE = 1000
+RECONNECT_DELAY_S = 5
+
+# Put on a client's queue when it is dropped
+CLOSED = None
+
+_fanouts = weakref.WeakKeyDictionary()
+
+class EventFanout:
+    def __init__(self, channel=EVENTS_CHANNEL, queue_size=CLIENT_QUEUE_SIZE):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._queues = set()
+        self._task = None
+
+    def subscribe(self):
+        """Queue receiving (event_type, data) for every event, CLOSED when the client is dropped."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._queues.discard(queue)
+        if not self._queues and self._task is not None:
+            # No clients left, release the Redis connection
+            self._task.cancel()
+            self._task = None
+
+    def _publish(self, data):
+        event = (json.loads(data).get("type"), data)
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                print("[SSE] Dropping client that stopped reading events")
+                self._queues.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(CLOSED)
+
+    async def _run(self):
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message:
+                        self._publish(message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[SSE] Event subscription failed, reconnecting in {RECONNECT_DELAY_S}s: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_S)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+def get_event_fanout():
+    """The fan-out of the running event loop. Must be called from inside the loop."""
+    loop = asyncio.get_running_loop()
+    fanout = _fanouts.get(loop)
+    if fanout is None:
+        fanout = EventFanout()
+        _fanouts[loop] = fanout
+    return fanout
@@ -1,3 +1,788 @@
-from django.test import TestCase
+import re
+import json
+import asyncio
+import datetime
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import fakeredis
+from lxml import html as lxml_html
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from benchmarks.erp_standin import ERPStandin, StandinConfig, OA_PATH, PAGE_SIZE, po_number as standin_po_number
+from indusproject import metrics, po_store, status_store
+from indusproject.engine import ERPEngine
+from indusproject.http_scraper import HttpScrapeError, _next_page_url, build_client, fetch_po_details, fetch_po_list
+from indusproject.readiness import wait_for_ready
+from indusproject.resilience import (
+    MIN_TIMEOUT_MS, CircuitBreaker, CircuitOpenError, LatencyTracker, Resilience, backoff_delay
+)
+from indusproject.run_manifest import RunManifest, DONE, FAILED, PENDING
+from indusproject.scrapper import (
+    PO_RETRY_KEY, Checkpoint, add_failed_pos, collect_po_numbers, filter_new_pos, forget_failed,
+    remember_failed, scrape_po_via_link
+)
+from indusproject.table_extract import parse_line_items, parse_po_list, parse_status_rows
+from .cache import VersionedResponseCache
+from .utils import project_fields
+
+
+def po(po_number, rev="0", order_date="05-JAN-2025", site_id="S1", project_id="P1"):
+    return {
+        "po_number": po_number,
+        "rev": rev,
+        "order_date": order_date,
+        "project": [{"site_id": site_id, "project_id": project_id, "line_items": []}],
+    }
+
+def day(value):
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+class FakeRedisTestCase(SimpleTestCase):
+    """Runs the storage modules against an in-memory fakeredis server."""
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        for module in (
+            "indusproject.po_store", "indusproject.status_store", "indusproject.scrapper",
+            "indusproject.run_manifest", "indusproject.metrics", "indusapi.cache",
+        ):
+            patcher = mock.patch(f"{module}.get_redis", return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+# ================= table extraction =================
+class TableExtractTests(SimpleTestCase):
+    def detail_row(self, line, site, project):
+        cells = [""] * 28
+        cells[2], cells[4], cells[6], cells[8], cells[9] = line, "ITEM", "Desc", "2", "10.00"
+        cells[25], cells[27] = site, project
+        return cells
+
+    def test_line_items_use_default_columns(self):
+        table = {"headers": [], "rows": [self.detail_row("1", "S1", "P1"), self.detail_row("Total", "", ""), ["short"]]}
+        self.assertEqual(parse_line_items(table, "100"), [{
+            "line": "1", "item_job": "ITEM", "description": "Desc", "qty": "2", "price": "10.00",
+            "project_id": "P1", "indus_id": "S1",
+        }])
+
+    def test_line_items_follow_the_header_layout(self):
+        headers = ["Line", "Item/Job", "Description", "Qty", "Price", "Site ID", "Project Name"] + [""] * 5
+        row = ["3", "ITEM", "Desc", "1", "5.00", "S9", "P9"] + [""] * 5
+        items = parse_line_items({"headers": headers, "rows": [row]})
+        self.assertEqual((items[0]["line"], items[0]["indus_id"], items[0]["project_id"]), ("3", "S9", "P9"))
+
+    def test_orders_rows(self):
+        row = ["4500000001", "2", "", "", "", "05-JAN-2025", "", "", "", "", "", "", "Open"]
+        table = {"rows": [row, ["Next 25"] + [""] * 12], "links": ["https://erp/po?1", "javascript:next()"]}
+        self.assertEqual(parse_po_list(table), [{
+            "po_number": "4500000001", "rev": "2", "order_date": "05-JAN-2025", "detail_url": "https://erp/po?1",
+        }])
+        self.assertEqual(parse_status_rows(table), [{"po_number": "4500000001", "status": "Open"}])
+
+
+# ================= deep links =================
+class FakePage:
+    """The parts of a Playwright page that navigation touches; goto raises `goto_error`."""
+    def __init__(self, goto_error=None):
+        self.goto_error = goto_error
+        self.visited = []
+        self.context = mock.AsyncMock()
+
+    async def goto(self, url):
+        self.visited.append(url)
+        if self.goto_error:
+            raise self.goto_error
+
+
+class DeepLinkTests(SimpleTestCase):
+    def scrape(self, page, po):
+        return asyncio.run(scrape_po_via_link(None, page, po))
+
+    def test_missing_link_falls_back_to_search(self):
+        page = FakePage()
+        self.assertFalse(self.scrape(page, {"po_number": "100"}))
+        self.assertEqual(page.visited, [])
+
+    def test_link_that_fails_to_load_falls_back_to_search(self):
+        entry = {"po_number": "100", "detail_url": "https://erp/po?100"}
+        page = FakePage(goto_error=PlaywrightError("net::ERR_CONNECTION_RESET"))
+        self.assertFalse(self.scrape(page, entry))
+        self.assertEqual(page.visited, ["https://erp/po?100"])
+        self.assertNotIn("project", entry)
+
+    def test_navigation_timeout_falls_back_to_search(self):
+        page = FakePage(goto_error=PlaywrightTimeoutError("Timeout 30000ms exceeded"))
+        self.assertFalse(self.scrape(page, {"po_number": "100", "detail_url": "https://erp/po?100"}))
+
+
+# ================= HTTP scraping =================
+class NextPageUrlTests(SimpleTestCase):
+    orders_url = "https://erp/OA_HTML/OA.jsp?page=orders"
+
+    def next_url(self, link):
+        return _next_page_url(lxml_html.fromstring(f"<html><body><table></table>{link}</body></html>"), self.orders_url)
+
+    def test_full_page_link(self):
+        link = '<a class="x49" title="Next 25" href="OA.jsp?page=orders&amp;start=25">Next 25</a>'
+        self.assertEqual(self.next_url(link), "https://erp/OA_HTML/OA.jsp?page=orders&start=25")
+
+    def test_short_page_link(self):
+        link = '<a href="OA.jsp?page=orders&amp;start=50">Next 5</a>'
+        self.assertEqual(self.next_url(link), "https://erp/OA_HTML/OA.jsp?page=orders&start=50")
+
+    def test_disabled_or_missing_link_ends_pagination(self):
+        self.assertIsNone(self.next_url('<a class="x49 disabled" title="Next 5">Next 5</a>'))
+        self.assertIsNone(self.next_url('<a href="OA.jsp?page=orders&amp;start=0">Previous 25</a>'))
+
+    def test_javascript_link_needs_the_browser(self):
+        with self.assertRaises(HttpScrapeError):
+            self.next_url('<a href="javascript:submitForm(1)">Next 25</a>')
+
+
+# ================= session reuse =================
+class SessionReuseTests(SimpleTestCase):
+    def reuse(self, page, cached):
+        engine = ERPEngine()
+        engine.new_page = mock.AsyncMock(return_value=page)
+        with mock.patch("indusproject.engine.load_session", return_value=cached), \
+                mock.patch("indusproject.engine.clear_session") as clear_session:
+            return asyncio.run(engine._reuse_session()), engine, clear_session
+
+    def test_nothing_cached(self):
+        reused, engine, clear_session = self.reuse(FakePage(), (None, None))
+        self.assertIsNone(reused)
+        engine.new_page.assert_not_called()
+        clear_session.assert_not_called()
+
+    def test_orders_url_that_fails_to_load_logs_in_again(self):
+        page = FakePage(goto_error=PlaywrightError("net::ERR_NAME_NOT_RESOLVED"))
+        reused, _, clear_session = self.reuse(page, ({"cookies": []}, "https://erp/orders"))
+        self.assertIsNone(reused)
+        self.assertEqual(page.visited, ["https://erp/orders"])
+        clear_session.assert_called_once_with()
+        page.context.close.assert_awaited_once_with()
+
+
+# ================= incremental collection =================
+def orders_table(*entries):
+    rows = [[number, rev, "", "", "", "05-JAN-2025"] + [""] * 7 for number, rev in entries]
+    return {"headers": [], "rows": rows, "links": [f"https://erp/po?{number}" for number, _ in entries]}
+
+
+class FakeOrdersEngine:
+    def __init__(self, tables):
+        self.tables = tables
+        self.pages_read = 0
+
+    async def paginate(self, max_pages=None):
+        for page_number, table in enumerate(self.tables[:max_pages], 1):
+            self.pages_read = page_number
+            yield page_number, table
+
+
+class IncrementalCollectionTests(FakeRedisTestCase):
+    def setUp(self):
+        super().setUp()
+        self.redis.hset(po_store.PO_REVISION_KEY, mapping={"4500000002": "0", "4500000003": "1"})
+
+    def numbers(self, entries):
+        return [e["po_number"] for e in entries]
+
+    def test_new_and_revised_pos_are_kept(self):
+        entries = parse_po_list(orders_table(("4500000001", "0"), ("4500000002", "0"), ("4500000003", "2")))
+        kept, reached_known = filter_new_pos(entries)
+        self.assertEqual(self.numbers(kept), ["4500000001", "4500000003"])
+        self.assertTrue(reached_known)
+
+    def test_page_of_new_pos_does_not_stop(self):
+        kept, reached_known = filter_new_pos(parse_po_list(orders_table(("4500000009", "0"))))
+        self.assertEqual(self.numbers(kept), ["4500000009"])
+        self.assertFalse(reached_known)
+
+    def test_collection_stops_after_the_first_page_with_a_known_po(self):
+        engine = FakeOrdersEngine([
+            orders_table(("4500000009", "0"), ("4500000008", "0")),
+            orders_table(("4500000001", "0"), ("4500000002", "0")),
+            orders_table(("4500000000", "0")),
+        ])
+        po_numbers = asyncio.run(collect_po_numbers(engine, None, incremental=True))
+        self.assertEqual(self.numbers(po_numbers), ["4500000009", "4500000008", "4500000001"])
+        self.assertEqual(engine.pages_read, 2)
+
+    def test_full_collection_reads_every_page(self):
+        engine = FakeOrdersEngine([orders_table(("4500000002", "0")), orders_table(("4500000000", "0"))])
+        po_numbers = asyncio.run(collect_po_numbers(engine, None))
+        self.assertEqual(self.numbers(po_numbers), ["4500000002", "4500000000"])
+
+    def test_failed_pos_are_retried_until_stored(self):
+        remember_failed([{"po_number": "4500000007", "rev": "0", "order_date": "05-JAN-2025", "detail_url": "x"}])
+
+        listed = [{"po_number": "4500000009"}]
+        retries = add_failed_pos(listed)
+        self.assertEqual(self.numbers(listed), ["4500000009", "4500000007"])
+        self.assertNotIn("detail_url", retries[0])
+        self.assertEqual(add_failed_pos([{"po_number": "4500000007"}]), [])
+
+        forget_failed(["4500000007"])
+        self.assertEqual(add_failed_pos([]), [])
+
+
+# ================= per-PO storage =================
+class PerPoStorageTests(FakeRedisTestCase):
+    def test_upsert_indexes_records(self):
+        po_store.upsert_records([po("100", site_id="S1"), po("200", site_id="S2")])
+
+        self.assertEqual(po_store.count_records(), 2)
+        self.assertEqual([r["po_number"] for r in po_store.get_records(["200", "missing", "100"])], ["200", "100"])
+        self.assertEqual(self.redis.smembers(po_store.SITE_INDEX_KEY.format("S1")), {b"100"})
+        self.assertEqual(self.redis.hget(po_store.PO_REVISION_KEY, "100"), b"0")
+
+    def test_replacing_a_record_moves_its_index_entries(self):
+        po_store.upsert_records([po("100", site_id="S1")])
+        po_store.upsert_records([po("100", site_id="S2")])
+
+        self.assertEqual(self.redis.smembers(po_store.SITE_INDEX_KEY.format("S1")), set())
+        self.assertEqual(self.redis.smembers(po_store.SITE_INDEX_KEY.format("S2")), {b"100"})
+        self.assertEqual(po_store.count_records(), 1)
+
+    def test_records_iterate_in_order_date_order(self):
+        po_store.upsert_records([
+            po("300", order_date="07-JAN-2025"),
+            po("100", order_date="05-JAN-2025"),
+            po("200", order_date="06-JAN-2025"),
+        ])
+        self.assertEqual([r["po_number"] for r in po_store.iter_records(chunk_size=2)], ["100", "200", "300"])
+
+    def test_migrate_legacy_blob_keeps_a_backup(self):
+        self.redis.set(po_store.LEGACY_BLOB_KEY, json.dumps([po("100"), po("200")]))
+
+        self.assertEqual(po_store.migrate_legacy_blob(), 2)
+        self.assertEqual(po_store.count_records(), 2)
+        self.assertFalse(self.redis.exists(po_store.LEGACY_BLOB_KEY))
+        self.assertTrue(self.redis.exists(po_store.LEGACY_BACKUP_KEY))
+
+
+# ================= pagination, filters, projection =================
+class QueryRecordsTests(FakeRedisTestCase):
+    def setUp(self):
+        super().setUp()
+        po_store.upsert_records([
+            po("4500000001", order_date="03-JAN-2025", site_id="S1", project_id="P1"),
+            po("4500000002", order_date="04-JAN-2025", site_id="S2", project_id="P1"),
+            po("4500000003", order_date="05-JAN-2025", site_id="S1", project_id="P2"),
+            po("4600000004", order_date="05-JAN-2025", site_id="S1", project_id="P1"),
+        ])
+
+    def numbers(self, records):
+        return [r["po_number"] for r in records]
+
+    def test_cursor_pagination_returns_every_record_once(self):
+        seen, cursor = [], None
+        while True:
+            records, cursor = po_store.query_records(cursor=cursor, limit=3)
+            seen.extend(self.numbers(records))
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["4500000001", "4500000002", "4500000003", "4600000004"])
+
+    def test_last_page_has_no_cursor(self):
+        records, cursor = po_store.query_records(limit=4)
+        self.assertEqual(len(records), 4)
+        self.assertIsNone(cursor)
+
+    def test_date_range_is_inclusive(self):
+        records, _ = po_store.query_records(date_from=day("2025-01-04"), date_to=day("2025-01-05"))
+        self.assertEqual(self.numbers(records), ["4500000002", "4500000003", "4600000004"])
+
+    def test_date_only_upper_bound_covers_the_whole_day(self):
+        records, _ = po_store.query_records(date_to=po_store.parse_iso_end_date("2025-01-04"))
+        self.assertEqual(self.numbers(records), ["4500000001", "4500000002"])
+
+    def test_site_project_and_prefix_filters_combine(self):
+        records, _ = po_store.query_records(site_id="S1")
+        self.assertEqual(self.numbers(records), ["4500000001", "4500000003", "4600000004"])
+
+        records, _ = po_store.query_records(site_id="S1", project_id="P1", po_prefix="45")
+        self.assertEqual(self.numbers(records), ["4500000001"])
+
+        records, _ = po_store.query_records(po_prefix="47")
+        self.assertEqual(records, [])
+
+    def test_filtered_pages_leave_no_temporary_keys(self):
+        records, cursor = po_store.query_records(site_id="S1", po_prefix="4", limit=2)
+        records, cursor = po_store.query_records(site_id="S1", po_prefix="4", cursor=cursor, limit=2)
+        self.assertEqual(self.numbers(records), ["4600000004"])
+        self.assertEqual(self.redis.keys(po_store.QUERY_TMP_KEY.format("*")), [])
+
+    def test_malformed_cursor_is_rejected(self):
+        self.assertIsNone(po_store.parse_cursor("4500000001"))
+        with self.assertRaises(ValueError):
+            po_store.query_records(cursor="not-a-cursor", limit=2)
+
+
+class DateParsingTests(SimpleTestCase):
+    def test_api_dates_are_iso(self):
+        self.assertEqual(po_store.parse_iso_date("2025-01-02"), day("2025-01-02"))
+        self.assertIsNone(po_store.parse_iso_date("02-JAN-2025"))
+        self.assertIsNone(po_store.parse_iso_date(""))
+
+    def test_date_to_is_the_end_of_the_day(self):
+        self.assertEqual(po_store.parse_iso_end_date("2025-01-02"), f"({day('2025-01-03')!r}")
+        self.assertEqual(po_store.parse_iso_end_date("2025-01-02T12:00:00"), day("2025-01-02T12:00:00"))
+        self.assertIsNone(po_store.parse_iso_end_date("02-JAN-2025"))
+
+    def test_erp_dates_are_day_first(self):
+        self.assertEqual(po_store.parse_date("02-01-2025"), day("2025-01-02"))
+        self.assertEqual(po_store.parse_date("02-JAN-2025"), day("2025-01-02"))
+
+
+class ProjectFieldsTests(SimpleTestCase):
+    records = [{
+        "po_number": "100",
+        "rev": "1",
+        "project": [
+            {"site_id": "S1", "project_id": "P1", "line_items": [{"line": "1"}]},
+            {"site_id": "S2", "project_id": "P2", "line_items": []},
+        ],
+    }]
+
+    def test_nested_fields_inside_lists(self):
+        self.assertEqual(project_fields(self.records, "po_number, project.site_id"), [{
+            "po_number": "100",
+            "project": [{"site_id": "S1"}, {"site_id": "S2"}],
+        }])
+
+    def test_unknown_fields_are_skipped(self):
+        self.assertEqual(project_fields(self.records, ["rev", "missing"]), [{"rev": "1"}])
+
+    def test_no_fields_returns_records_unchanged(self):
+        self.assertIs(project_fields(self.records, None), self.records)
+
+
+# ================= status hash =================
+class StatusLookupTests(FakeRedisTestCase):
+    def test_statuses_in_request_order(self):
+        status_store.write_statuses([
+            {"po_number": "100", "status": "Open"},
+            {"po_number": "200", "status": "Closed"},
+        ])
+        self.assertEqual(status_store.get_statuses(["200", "300", "100"]), ["Closed", None, "Open"])
+
+    def test_no_snapshot_yet(self):
+        self.assertIsNone(status_store.get_statuses(["100"]))
+
+    def test_empty_scrape_keeps_previous_snapshot(self):
+        status_store.write_statuses([{"po_number": "100", "status": "Open"}])
+        self.assertEqual(status_store.write_statuses([]), (0, []))
+        self.assertEqual(status_store.get_statuses(["100"]), ["Open"])
+
+    def test_snapshot_is_replaced(self):
+        status_store.write_statuses([{"po_number": "100", "status": "Open"}])
+        status_store.write_statuses([{"po_number": "200", "status": "Open"}])
+        self.assertEqual(status_store.get_statuses(["100", "200"]), [None, "Open"])
+
+
+# ================= response cache =================
+class ResponseCacheTests(SimpleTestCase):
+    def test_newer_version_drops_older_entries(self):
+        cache = VersionedResponseCache("test", "version")
+        cache.put(("1", "a"), (b"one", 200))
+        cache.put(("2", "a"), (b"two", 200))
+        self.assertIsNone(cache.get(("1", "a")))
+        self.assertEqual(cache.get(("2", "a")), (b"two", 200))
+
+        cache.put(("1", "b"), (b"stale", 200))
+        self.assertIsNone(cache.get(("1", "b")))
+
+    def test_byte_budget(self):
+        cache = VersionedResponseCache("test", "version", max_bytes=10, max_entry_bytes=6)
+        cache.put(("1", "big"), (b"x" * 7, 200))
+        for digest in "abc":
+            cache.put(("1", digest), (b"x" * 4, 200))
+        self.assertIsNone(cache.get(("1", "big")))
+        self.assertIsNone(cache.get(("1", "a")))
+        self.assertIsNotNone(cache.get(("1", "c")))
+
+
+class PoDataETagTests(FakeRedisTestCase):
+    def post(self, **headers):
+        return self.client.post(
+            "/api/po-data/", {"limit": 10}, content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {settings.STATIC_API_TOKEN}", **headers
+        )
+
+    def test_unchanged_data_is_not_modified(self):
+        po_store.upsert_records([po("100")])
+        first = self.post()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.content)["records"], 1)
+
+        again = self.post(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+    def test_new_data_changes_the_etag(self):
+        po_store.upsert_records([po("100")])
+        first = self.post()
+        po_store.upsert_records([po("200")])
+
+        second = self.post(HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(json.loads(second.content)["records"], 2)
+
+
+# ================= revision dedupe =================
+class RevisionDedupeTests(FakeRedisTestCase):
+    def test_numeric_revisions_compare_as_numbers(self):
+        self.assertTrue(po_store.is_newer_revision("10", "9"))
+        self.assertFalse(po_store.is_newer_revision("9", "10"))
+        self.assertFalse(po_store.is_newer_revision("1", "1"))
+
+    def test_ingest_inserts_updates_and_skips(self):
+        summary = po_store.ingest_records([po("100"), po("200")])
+        self.assertEqual([r["po_number"] for r in summary["inserted"]], ["100", "200"])
+
+        summary = po_store.ingest_records([po("100", rev="1"), po("200", rev="0"), po("300")])
+        self.assertEqual([r["po_number"] for r in summary["inserted"]], ["300"])
+        self.assertEqual([r["po_number"] for r in summary["updated"]], ["100"])
+        self.assertEqual(summary["unchanged"], 1)
+        self.assertEqual(po_store.get_records(["100"])[0]["rev"], "1")
+
+    def test_older_revision_does_not_replace_stored_one(self):
+        po_store.ingest_records([po("100", rev="2", site_id="NEW")])
+        summary = po_store.ingest_records([po("100", rev="1", site_id="OLD")])
+        self.assertEqual(summary["unchanged"], 1)
+        self.assertEqual(po_store.get_records(["100"])[0]["project"][0]["site_id"], "NEW")
+
+    def test_newest_revision_within_a_batch_wins(self):
+        summary = po_store.ingest_records([po("100", rev="1"), po("100", rev="3"), po("100", rev="2")])
+        self.assertEqual([r["rev"] for r in summary["inserted"]], ["3"])
+
+    def test_same_day_pos_are_distinct(self):
+        summary = po_store.ingest_records([po("100", order_date="05-JAN-2025"), po("200", order_date="05-JAN-2025")])
+        self.assertEqual(len(summary["inserted"]), 2)
+
+
+# ================= change stream =================
+class ChangeStreamTests(FakeRedisTestCase):
+    def test_changes_are_read_incrementally(self):
+        po_store.ingest_records([po("100"), po("200")])
+        changes, last_id, truncated = po_store.read_changes("0-0", count=1)
+        self.assertEqual([(c["change"], c["po_number"]) for c in changes], [("inserted", "100")])
+        self.assertFalse(truncated)
+
+        po_store.ingest_records([po("100", rev="1")])
+        changes, last_id, _ = po_store.read_changes(last_id)
+        self.assertEqual([(c["change"], c["po_number"]) for c in changes], [("inserted", "200"), ("updated", "100")])
+        self.assertEqual(changes[-1]["record"]["rev"], "1")
+
+        self.assertEqual(po_store.read_changes(last_id)[:2], ([], last_id))
+
+    def test_unchanged_pos_are_not_appended(self):
+        po_store.ingest_records([po("100")])
+        po_store.ingest_records([po("100")])
+        self.assertEqual(len(po_store.read_changes("0")[0]), 1)
+
+    def test_start_positions_are_never_truncated(self):
+        po_store.ingest_records([po("100"), po("200"), po("300")])
+        self.redis.xtrim(po_store.PO_STREAM_KEY, maxlen=1, approximate=False)
+        for last_id in ("0", "0-0"):
+            self.assertFalse(po_store.read_changes(last_id)[2])
+
+    def test_trimmed_position_is_truncated(self):
+        po_store.ingest_records([po("100")])
+        first_id = po_store.read_changes("0")[1]
+        po_store.ingest_records([po("200"), po("300")])
+        self.redis.xtrim(po_store.PO_STREAM_KEY, maxlen=1, approximate=False)
+        changes, _, truncated = po_store.read_changes(first_id)
+        self.assertTrue(truncated)
+        self.assertEqual([c["po_number"] for c in changes], ["300"])
+
+
+# ================= status changes =================
+class StatusChangeTests(FakeRedisTestCase):
+    def test_diff_statuses(self):
+        transitions = status_store.diff_statuses(
+            {"100": "Open", "200": "Open"}, {"100": "Closed", "200": "Open", "300": "Open"}, 1.0
+        )
+        self.assertEqual(transitions, [
+            {"po_number": "100", "from": "Open", "to": "Closed", "changed_at": 1.0},
+            {"po_number": "300", "from": None, "to": "Open", "changed_at": 1.0},
+        ])
+
+    def test_first_snapshot_records_no_transitions(self):
+        self.assertEqual(status_store.diff_statuses({}, {"100": "Open"}, 1.0), [])
+
+    def write(self, statuses, at):
+        with mock.patch("indusproject.status_store.time.time", return_value=at):
+            return status_store.write_statuses([{"po_number": k, "status": v} for k, v in statuses.items()])
+
+    def test_changes_since(self):
+        self.write({"100": "Open", "200": "Open"}, 100.0)
+        self.write({"100": "Closed", "200": "Open"}, 200.0)
+        self.write({"100": "Closed", "200": "Closed"}, 300.0)
+
+        transitions, _ = status_store.read_status_changes(since=250.0)
+        self.assertEqual([(t["po_number"], t["from"], t["to"]) for t in transitions], [("200", "Open", "Closed")])
+        transitions, _ = status_store.read_status_changes(since=0)
+        self.assertEqual([t["po_number"] for t in transitions], ["100", "200"])
+
+    def test_cursor_survives_the_cursor_po_changing_again(self):
+        pos = [f"P{i}" for i in range(6)]
+        self.write({p: "Open" for p in pos}, 100.0)
+        self.write({p: "Closed" for p in pos}, 200.0)
+        transitions, cursor = status_store.read_status_changes(limit=2)
+        self.assertEqual([t["po_number"] for t in transitions], ["P0", "P1"])
+
+        # The cursor PO moves again between two page requests
+        self.write({p: ("Open" if p == "P1" else "Closed") for p in pos}, 300.0)
+        seen = []
+        while cursor:
+            transitions, cursor = status_store.read_status_changes(cursor=cursor, limit=2)
+            seen.extend(t["po_number"] for t in transitions)
+        self.assertEqual(seen, ["P2", "P3", "P4", "P5", "P1"])
+
+
+# ================= event stream =================
+class EventStreamTests(SimpleTestCase):
+    def test_wsgi_request_is_refused(self):
+        response = self.client.get("/api/events/", HTTP_AUTHORIZATION=f"Bearer {settings.STATIC_API_TOKEN}")
+        self.assertEqual(response.status_code, 501)
+
+    def test_token_is_checked_first(self):
+        self.assertEqual(self.client.get("/api/events/").status_code, 401)
+
+
+# ================= Orders pagination =================
+class FakeNextLink:
+    def __init__(self, text, title=None, css_class="x49"):
+        self.text = text
+        self.title = title
+        self.css_class = css_class
+        self.clicks = 0
+
+    def matches(self, selector):
+        """Playwright semantics of the two forms NEXT_PAGE_SELECTOR combines."""
+        for alternative in selector.split(","):
+            has_text = re.fullmatch(r"\s*a:has-text\('(.*)'\)\s*", alternative)
+            by_title = re.fullmatch(r"\s*a\.(\w+)\[title\^='(.*)'\]\s*", alternative)
+            if has_text and has_text.group(1).lower() in self.text.lower():
+                return True
+            if by_title and by_title.group(1) in self.css_class.split() and (self.title or "").startswith(by_title.group(2)):
+                return True
+        return False
+
+    async def get_attribute(self, name):
+        return self.css_class if name == "class" else None
+
+    async def click(self):
+        self.clicks += 1
+
+
+class FakeLinksPage:
+    def __init__(self, links):
+        self.links = links
+        self.page_index = 0
+
+    async def query_selector(self, selector):
+        link = self.links[self.page_index] if self.page_index < len(self.links) else None
+        self.page_index += 1
+        return link if link is not None and link.matches(selector) else None
+
+
+class PaginateTests(SimpleTestCase):
+    def pages(self, links, max_pages=None):
+        async def read():
+            engine = ERPEngine()
+            return [number async for number, _ in engine.paginate(FakeLinksPage(links), max_pages=max_pages)]
+
+        with mock.patch("indusproject.engine.wait_for_ready", new=mock.AsyncMock(return_value=True)), \
+                mock.patch("indusproject.engine.extract_table", new=mock.AsyncMock(return_value={"rows": []})), \
+                mock.patch("indusproject.engine.rows_signature", new=mock.AsyncMock(return_value="sig")), \
+                mock.patch("indusproject.engine.wait_for_rows_change", new=mock.AsyncMock(return_value=True)):
+            return asyncio.run(read())
+
+    def test_follows_next_links_of_any_size(self):
+        links = [FakeNextLink("Next 25", title="Next 25"), FakeNextLink("Next 5", css_class="")]
+        self.assertEqual(self.pages(links), [1, 2, 3])
+        self.assertEqual([link.clicks for link in links], [1, 1])
+
+    def test_stops_at_a_disabled_link(self):
+        links = [FakeNextLink("Next 5", title="Next 5", css_class="x49 disabled")]
+        self.assertEqual(self.pages(links), [1])
+        self.assertEqual(links[0].clicks, 0)
+
+    def test_stops_after_max_pages(self):
+        self.assertEqual(self.pages([FakeNextLink("Next 25", title="Next 25")] * 3, max_pages=2), [1, 2])
+
+
+# ================= run manifest =================
+class RunManifestTests(FakeRedisTestCase):
+    entries = [{"po_number": number, "rev": "0", "order_date": "05-JAN-2025"} for number in ("100", "200", "300")]
+
+    def numbers(self, entries):
+        return [e["po_number"] for e in entries]
+
+    def test_interrupted_run_resumes_with_the_pos_not_done(self):
+        manifest = RunManifest("job")
+        manifest.start(self.entries)
+        manifest.mark(["100"], DONE)
+        manifest.mark(["200"], FAILED)
+        self.assertEqual(self.numbers(RunManifest("job").resume()), ["200", "300"])
+        self.assertEqual(RunManifest("other-job").resume(), [])
+
+    def test_finished_run_is_not_resumed(self):
+        manifest = RunManifest("job")
+        manifest.start(self.entries)
+        manifest.mark(["100", "200"], DONE)
+        manifest.mark(["300"], FAILED)
+        self.assertEqual(manifest.finish(), {DONE: 2, FAILED: 1, PENDING: 0})
+        self.assertEqual(manifest.resume(), [])
+        self.assertEqual(self.redis.keys("indus_po_run:*"), [])
+
+    def test_new_run_replaces_the_previous_manifest(self):
+        manifest = RunManifest("job")
+        manifest.start(self.entries)
+        manifest.mark(["100"], DONE)
+        manifest.start(self.entries[:1])
+        self.assertEqual(self.numbers(manifest.resume()), ["100"])
+
+    def test_checkpoint_stores_scraped_pos_and_keeps_failed_ones(self):
+        checkpoint = Checkpoint("job")
+        checkpoint.start(self.entries[:2])
+        scraped = {**po("100"), "detail_url": "https://erp/po?100"}
+        checkpoint.commit([scraped, dict(self.entries[1])])
+
+        self.assertEqual(po_store.count_records(), 1)
+        self.assertNotIn("detail_url", po_store.get_records(["100"])[0])
+        self.assertEqual(self.numbers(checkpoint.resume()), ["200"])
+        self.assertEqual(self.redis.hkeys(PO_RETRY_KEY), [b"200"])
+
+
+# ================= retries and circuit breaker =================
+class ResilienceTests(FakeRedisTestCase):
+    def test_backoff_is_jittered_below_the_cap(self):
+        for attempt in range(8):
+            self.assertTrue(0 <= backoff_delay(attempt, base=0.5, cap=4.0) <= min(4.0, 0.5 * 2 ** attempt))
+
+    def test_timeout_follows_the_observed_latency_within_bounds(self):
+        tracker = LatencyTracker({"detail": 20000})
+        self.assertEqual(tracker.timeout("detail"), 20000)
+
+        tracker.observe("detail", 2000)
+        self.assertEqual([tracker.timeout("detail", attempt) for attempt in range(3)], [8000, 16000, 20000])
+
+        fast = LatencyTracker({"detail": 20000})
+        fast.observe("detail", 100)
+        self.assertEqual(fast.timeout("detail"), MIN_TIMEOUT_MS)
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(threshold=2)
+        breaker.record_failure("a")
+        breaker.record_success()
+        breaker.record_failure("b")
+        breaker.check()
+        breaker.record_failure("c")
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+
+    def call(self, resilience, action, on_retry=None):
+        with mock.patch("indusproject.resilience.backoff_delay", return_value=0):
+            return asyncio.run(resilience.call("detail", action, on_retry))
+
+    def test_timeouts_are_retried(self):
+        resilience = Resilience(attempts=3)
+        timeouts = []
+
+        async def action(timeout):
+            timeouts.append(timeout)
+            if len(timeouts) < 3:
+                raise PlaywrightTimeoutError("slow")
+            return "loaded"
+
+        on_retry = mock.AsyncMock()
+        self.assertEqual(self.call(resilience, action, on_retry), "loaded")
+        self.assertEqual(len(timeouts), 3)
+        self.assertEqual((resilience.retries, resilience.timeouts, on_retry.await_count), (2, 2, 2))
+        self.assertEqual(resilience.breaker.failures, 0)
+
+    def test_exhausted_retries_count_against_the_breaker(self):
+        resilience = Resilience(attempts=2, breaker_threshold=1)
+
+        async def action(timeout):
+            raise PlaywrightTimeoutError("slow")
+
+        with self.assertRaises(PlaywrightTimeoutError):
+            self.call(resilience, action)
+        with self.assertRaises(CircuitOpenError):
+            self.call(resilience, action)
+
+
+# ================= HTTP scraping against the ERP stand-in =================
+class HttpScraperStandinTests(SimpleTestCase):
+    def scrape(self, config, details=False):
+        with ERPStandin(config) as erp:
+            login = httpx.post(erp.login_url, data={"usernameField": "u", "passwordField": "p"}, allow_redirects=False)
+            cookies = [{"name": name, "value": value, "domain": "127.0.0.1"} for name, value in login.cookies.items()]
+            with build_client(cookies) as client:
+                entries = fetch_po_list(client, f"{erp.base_url}{OA_PATH}?page=orders", None)
+                pending = fetch_po_details(client, entries) if details else None
+        return entries, pending
+
+    def config(self, **options):
+        return StandinConfig(latency_ms=0, jitter_ms=0, asset_latency_ms=0, **options)
+
+    def test_list_follows_the_short_last_page(self):
+        entries, _ = self.scrape(self.config(pos=PAGE_SIZE + 5))
+        self.assertEqual([e["po_number"] for e in entries], [standin_po_number(i) for i in range(PAGE_SIZE + 5)])
+
+    def test_details_are_fetched(self):
+        entries, pending = self.scrape(self.config(pos=3, lines=2), details=True)
+        self.assertEqual(pending, [])
+        self.assertEqual([len(e["items"]) for e in entries], [2, 2, 2])
+        self.assertTrue(all(e["creation_date"] for e in entries))
+
+    def test_expired_links_are_left_for_the_browser(self):
+        entries, pending = self.scrape(self.config(pos=3, expire_links=True), details=True)
+        self.assertEqual(pending, entries)
+
+
+# ================= metrics =================
+class MetricsTests(FakeRedisTestCase):
+    def setUp(self):
+        super().setUp()
+        # Drop what earlier tests buffered
+        metrics.flush()
+        self.redis.flushall()
+
+    def render(self):
+        metrics.flush()
+        return metrics.render_prometheus()
+
+    def test_histogram_exposes_every_bucket(self):
+        metrics.observe("scraper_stage_seconds", 0.3, stage="login")
+        lines = self.render().splitlines()
+
+        buckets = [line for line in lines if line.startswith('scraper_stage_seconds_bucket{stage="login"')]
+        expected = [f"{bound}" for bound in metrics.STAGE_BUCKETS] + ["+Inf"]
+        self.assertEqual([re.search(r'le="([^"]*)"', line).group(1) for line in buckets], expected)
+        self.assertIn('scraper_stage_seconds_bucket{stage="login",le="0.25"} 0', lines)
+        self.assertIn('scraper_stage_seconds_bucket{stage="login",le="0.5"} 1', lines)
+        self.assertIn('scraper_stage_seconds_count{stage="login"} 1', lines)
+
+    def test_counters_add_up_across_flushes(self):
+        metrics.inc("scraper_retries_total", step="detail")
+        metrics.flush()
+        metrics.inc("scraper_retries_total", 2, step="detail")
+        self.assertIn('scraper_retries_total{step="detail"} 3', self.render().splitlines())
+
+    def test_readiness_timeouts_are_counted_per_step(self):
+        page = mock.AsyncMock()
+        page.wait_for_selector.side_effect = PlaywrightTimeoutError("Timeout 10ms exceeded")
+        self.assertFalse(asyncio.run(wait_for_ready(page, "table", "orders", timeout=10)))
+        self.assertIn('scraper_timeouts_total{step="orders"} 1', self.render().splitlines())
@@ -1,10 +1,18 @@
 # indus_api/urls.py
 from django.urls import path
-from .views import get_po_data, bulk_scrape, update_erp_password, update_cron_time
+from .views import (
+    get_po_data, export_po_data, get_po_changes, bulk_scrape, get_po_status_changes, po_events,
+    update_erp_password, update_cron_time, metrics
+)
 
 urlpatterns = [
     path('api/po-data/', get_po_data),
+    path('api/po-data/export/', export_po_data),
+    path('api/po-data/changes/', get_po_changes),
     path('api/po-status/', bulk_scrape),
+    path('api/po-status/changes/', get_po_status_changes),
+    path('api/events/', po_events),
     path('api/update-password/', update_erp_password, name='update_erp_password'),
     path('api/update-time/', update_cron_time, name='update_cron_time'),
+    path('metrics', metrics, name='metrics'),
 ]
@@ -1,18 +1,89 @@
 
+import time
 from rest_framework.response import Response
 from functools import wraps
+from asyncio import iscoroutinefunction
 from django.conf import settings
+from django.http import JsonResponse
+from indusproject.metrics import observe
+
+def _token_error(request):
+    """(message, status) when the request is not authorized, otherwise None."""
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return "Authorization header missing or invalid", 401
+
+    token = auth_header.split(" ")[1]
+    if token != settings.STATIC_API_TOKEN:
+        return "Invalid token", 403
+    return None
 
 def token_required(view_func):
+    # Plain async Django views (not wrapped by DRF) get a JsonResponse instead of a DRF Response
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapped_async(request, *args, **kwargs):
+            error = _token_error(request)
+            if error:
+                return JsonResponse({"error": error[0]}, status=error[1])
+            return await view_func(request, *args, **kwargs)
+        return wrapped_async
+
     @wraps(view_func)
     def wrapped(request, *args, **kwargs):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return Response({"error": "Authorization header missing or invalid"}, status=401)
-
-        token = auth_header.split(" ")[1]
-        if token != settings.STATIC_API_TOKEN:
-            return Response({"error": "Invalid token"}, status=403)
+        error = _token_error(request)
+        if error:
+            return Response({"error": error[0]}, status=error[1])
 
         return view_func(request, *args, **kwargs)
     return wrapped
+
+def timed(view_name):
+    """Records the view's latency in api_request_duration_seconds{view=view_name}."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                observe("api_request_duration_seconds", time.perf_counter() - started, view=view_name)
+        return wrapped
+    return decorator
+
+def get_param(request, name, default=None):
+    """Reads a parameter from the JSON body, falling back to the query string."""
+    data = request.data if hasattr(request.data, "get") else {}
+    value = data.get(name)
+    if value is None:
+        value = request.query_params.get(name, default)
+    return value
+
+def _field_tree(fields):
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+def _project(value, tree):
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+def project_fields(records, fields):
+    """
+    Keeps only the requested fields of each record. Dotted names select nested
+    fields, also inside lists, e.g. "po_number,project.site_id".
+    """
+    if not fields:
+        return records
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(",") if f.strip()]
+    tree = _field_tree(fields)
+    return [_project(record, tree) for record in records]
@@ -1,12 +1,12 @@
 # indus_api/views.py
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
-import os, json
-from redis import Redis
+import os, re, json, zlib, time, asyncio, datetime
 from dotenv import load_dotenv
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponse
+from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
+from django.core.handlers.asgi import ASGIRequest
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
@@ -14,39 +14,164 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import status
 from indusproject.scheduler import update_job_schedule
-from .utils import token_required
+from indusproject.status_store import get_statuses, read_status_changes, PO_STATUS_VERSION_KEY
+from indusproject.po_store import (
+    query_records, parse_iso_date, parse_iso_end_date, parse_cursor, iter_raw_chunks, read_changes, PO_VERSION_KEY
+)
+from indusproject import metrics as scraper_metrics
+from .utils import token_required, get_param, project_fields, timed
+from .cache import VersionedResponseCache, cached_json_response
+from .event_fanout import get_event_fanout, CLOSED
 
 load_dotenv()
-redis_client = Redis(
-    host=os.getenv("REDIS_HOST"),
-    port=int(os.getenv("REDIS_PORT")),
-    db=int(os.getenv("REDIS_DB"))
-)
 
+PO_DATA_MAX_LIMIT = 1000
+STREAM_ID_RE = re.compile(r"^\d+(-\d+)?$")
+SSE_EVENT_TYPES = {"po", "status"}
+SSE_HEARTBEAT_SECONDS = 15
+
+# Rendered responses per worker, invalidated by the dataset version counters
+PO_DATA_CACHE = VersionedResponseCache("po-data", PO_VERSION_KEY)
+PO_STATUS_CACHE = VersionedResponseCache("po-status", PO_STATUS_VERSION_KEY)
+
+
+@timed("get_po_data")
 @api_view(['POST'])
 @authentication_classes([])  # Disable default DRF auth for this endpoint
 @permission_classes([]) 
 @token_required
 def get_po_data(request):
-
+    """
+    Optional parameters (JSON body or query string):
+      limit, cursor           - page size (max PO_DATA_MAX_LIMIT) and the next_cursor of the previous page
+      date_from, date_to      - order date range, ISO dates (YYYY-MM-DD)
+      po_number               - po_number prefix
+      site_id, project_id     - POs with a line item for the site / project
+      fields                  - comma separated projection, e.g. "po_number,order_date,project.site_id"
+    Without limit every matching record is returned. Responses carry an ETag and
+    are served from the per-worker cache until the PO data changes.
+    """
     try:
-        data = redis_client.get("indus_po_data")
+        limit = get_param(request, "limit")
+        if limit is not None:
+            limit = int(limit) if str(limit).isdigit() else 0
+            if not 0 < limit <= PO_DATA_MAX_LIMIT:
+                return Response({
+                    "status": "error",
+                    "message": f"'limit' must be between 1 and {PO_DATA_MAX_LIMIT}"
+                }, status=400)
+
+        date_range = {}
+        # A date-only date_to covers that whole day
+        for name, parse in (("date_from", parse_iso_date), ("date_to", parse_iso_end_date)):
+            value = get_param(request, name)
+            if value:
+                date_range[name] = parse(value)
+                if date_range[name] is None:
+                    return Response({"status": "error", "message": f"Invalid '{name}'"}, status=400)
+
+        cursor = get_param(request, "cursor")
+        if cursor and parse_cursor(cursor) is None:
+            return Response({"status": "error", "message": "Invalid 'cursor'"}, status=400)
+
+        params = {
+            "date_from": date_range.get("date_from"),
+            "date_to": date_range.get("date_to"),
+            "po_prefix": get_param(request, "po_number"),
+            "site_id": get_param(request, "site_id"),
+            "project_id": get_param(request, "project_id"),
+            "cursor": cursor,
+            "limit": limit,
+        }
+        fields = get_param(request, "fields")
+
+        def render():
+            records, next_cursor = query_records(**params)
+            if records:
+                return {
+                    "status": "success",
+                    "records": len(records),
+                    "next_cursor": next_cursor,
+                    "data": project_fields(records, fields)
+                }, 200
+            return {
+                "status": "error",
+                "message": "No data available. Please try again later."
+            }, 200
+
+        return cached_json_response(request, PO_DATA_CACHE, {**params, "fields": fields}, render)
+    except Exception as e:
+        return Response({"status": "error", "message": str(e)}, status=500)
+
+
+
+def _ndjson_chunks(gzip=False):
+    """One stored PO per line, read from Redis chunk by chunk; optionally gzip-compressed on the fly."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None  # wbits=31 -> gzip container
+    for chunk in iter_raw_chunks():
+        data = b"".join(raw + b"\n" for raw in chunk)
+        if compressor:
+            data = compressor.compress(data)
         if data:
-            records = json.loads(data)
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+@api_view(['GET', 'POST'])
+@authentication_classes([])  # Disable default DRF auth for this endpoint
+@permission_classes([])
+@token_required
+def export_po_data(request):
+    """
+    Streams every stored PO as NDJSON. Memory use stays flat regardless of the
+    dataset size; gzip is used when the client sends Accept-Encoding: gzip.
+    """
+    gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    response = StreamingHttpResponse(_ndjson_chunks(gzip), content_type="application/x-ndjson")
+    if gzip:
+        response["Content-Encoding"] = "gzip"
+    response["Vary"] = "Accept-Encoding"
+    response["Content-Disposition"] = 'attachment; filename="indus_po_data.ndjson"'
+    return response
+
+
+@api_view(['GET', 'POST'])
+@authentication_classes([])  # Disable default DRF auth for this endpoint
+@permission_classes([])
+@token_required
+def get_po_changes(request):
+    """
+    Incremental sync: POs inserted or updated after `last_id` (the last_id of the
+    previous response, "0-0" for the oldest retained change), at most `count` per call.
+    truncated=true means changes were trimmed before they were read and a full
+    reload is needed.
+    """
+    try:
+        last_id = str(get_param(request, "last_id", "0-0"))
+        if not STREAM_ID_RE.match(last_id):
+            return Response({"status": "error", "message": "Invalid 'last_id'"}, status=400)
+
+        count = str(get_param(request, "count", 100))
+        count = int(count) if count.isdigit() else 0
+        if not 0 < count <= PO_DATA_MAX_LIMIT:
             return Response({
-                "status": "success",
-                "records": len(records),
-                "data": records
-            })
+                "status": "error",
+                "message": f"'count' must be between 1 and {PO_DATA_MAX_LIMIT}"
+            }, status=400)
+
+        changes, next_id, truncated = read_changes(last_id, count)
         return Response({
-            "status": "error",
-            "message": "No data available. Please try again later."
+            "status": "success",
+            "records": len(changes),
+            "last_id": next_id,
+            "truncated": truncated,
+            "data": changes
         })
     except Exception as e:
         return Response({"status": "error", "message": str(e)}, status=500)
 
 
-
+@timed("bulk_scrape")
 @api_view(['POST'])
 @authentication_classes([])  # Disable default DRF auth for this endpoint
 @permission_classes([]) 
@@ -66,30 +191,131 @@ def bulk_scrape(request):
         if not po_numbers:
             return JsonResponse({"response": "error", "message": "No PO numbers provided"}, status=400)
 
-        cached_data = redis_client.get("Po_status")
-        if not cached_data:
-            return JsonResponse({"response": "error", "message": "No cached PO data found"}, status=500)
+        def render():
+            statuses = get_statuses(po_numbers)
+            if statuses is None:
+                return {"response": "error", "message": "No cached PO data found"}, 500
 
-        try:
-            records = json.loads(cached_data)
-        except json.JSONDecodeError:
-            return JsonResponse({"response": "error", "message": "Cached data format is invalid"}, status=500)
+            response = [
+                {
+                    "po number": po,
+                    "status": status if status is not None else "Not found"
+                }
+                for po, status in zip(po_numbers, statuses)
+            ]
+            return {
+                "response": response,
+            }, 200
+
+        return cached_json_response(request, PO_STATUS_CACHE, po_numbers, render)
+
+    except Exception as e:
+        return JsonResponse({"response": "error", "message": f"Server error: {str(e)}"}, status=500)
+
+
+@api_view(['GET', 'POST'])
+@authentication_classes([])  # Disable default DRF auth for this endpoint
+@permission_classes([])
+@token_required
+def get_po_status_changes(request):
+    """
+    POs whose status changed since `since` (ISO date or epoch seconds), with their
+    previous and current status. Page with `limit` and the returned `next_cursor`.
+    """
+    try:
+        since = get_param(request, "since")
+        if since is not None:
+            since = str(since)
+            since = float(since) if since.replace(".", "", 1).isdigit() else parse_iso_date(since)
+            if since is None:
+                return JsonResponse({"response": "error", "message": "Invalid 'since'"}, status=400)
 
-        record_map = {rec["po_number"]: rec["status"] for rec in records if isinstance(rec, dict)}
+        limit = str(get_param(request, "limit", 100))
+        limit = int(limit) if limit.isdigit() else 0
+        if not 0 < limit <= PO_DATA_MAX_LIMIT:
+            return JsonResponse({
+                "response": "error",
+                "message": f"'limit' must be between 1 and {PO_DATA_MAX_LIMIT}"
+            }, status=400)
+
+        cursor = get_param(request, "cursor")
+        if cursor and parse_cursor(cursor) is None:
+            return JsonResponse({"response": "error", "message": "Invalid 'cursor'"}, status=400)
+
+        transitions, next_cursor = read_status_changes(since, cursor, limit)
         response = [
             {
-                "po number": po,
-                "status": record_map.get(po, "Not found")
+                "po number": t["po_number"],
+                "status": t["to"],
+                "previous status": t["from"],
+                "changed_at": datetime.datetime.fromtimestamp(t["changed_at"], datetime.timezone.utc).isoformat()
             }
-            for po in po_numbers
+            for t in transitions
         ]
         return JsonResponse({
             "response": response,
+            "next_cursor": next_cursor,
         }, status=200)
 
     except Exception as e:
         return JsonResponse({"response": "error", "message": f"Server error: {str(e)}"}, status=500)
     
+async def _sse_stream(event_types):
+    """Relays the worker's fanned-out pub/sub events as SSE messages, with a comment line as keep-alive."""
+    fanout = get_event_fanout()
+    queue = fanout.subscribe()
+    try:
+        yield b"retry: 5000\n\n"
+        last_sent = time.monotonic()
+        while True:
+            idle = time.monotonic() - last_sent
+            try:
+                event = await asyncio.wait_for(queue.get(), max(0, SSE_HEARTBEAT_SECONDS - idle))
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                last_sent = time.monotonic()
+                continue
+            if event is CLOSED:
+                return
+            event_type, data = event
+            if event_type in event_types:
+                yield f"event: {event_type}\ndata: {data}\n\n".encode()
+                last_sent = time.monotonic()
+    finally:
+        fanout.unsubscribe(queue)
+
+@require_GET
+@token_required
+async def po_events(request):
+    """
+    Server-Sent Events stream of new/updated POs ("po") and PO status changes
+    ("status"); `types=po,status` selects which. Long-lived, so it must be served
+    by the ASGI application (indusproject/asgi.py).
+    """
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream and stay pinned to this client
+        return JsonResponse({"error": "The event stream is only served by the ASGI application"}, status=501)
+
+    requested = request.GET.get("types")
+    event_types = {t.strip() for t in requested.split(",")} & SSE_EVENT_TYPES if requested else SSE_EVENT_TYPES
+    if not event_types:
+        return JsonResponse({"error": f"'types' must be a subset of {sorted(SSE_EVENT_TYPES)}"}, status=400)
+
+    response = StreamingHttpResponse(_sse_stream(event_types), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let a reverse proxy buffer the stream
+    return response
+
+@api_view(['GET'])
+@authentication_classes([])  # Disable default DRF auth for this endpoint
+@permission_classes([])
+@token_required
+def metrics(request):
+    """Scraper stage timings, retry/timeout/failure counters and API latency, in Prometheus text format."""
+    scraper_metrics.flush()
+    return HttpResponse(scraper_metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @api_view(['POST'])
 @authentication_classes([])  # Disable default DRF auth for this endpoint
 @permission_classes([]) 
@@ -130,7 +356,7 @@ def update_erp_password(request):
 
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
-from indusproject.scheduler import update_job_schedule
+from indusproject.scheduler import update_job_schedule, JOB_FUNCTIONS
 from .utils import token_required
 
 @api_view(['POST'])
@@ -144,7 +370,7 @@ def update_cron_time(request):
         hour = int(request.data.get("hour"))
         minute = int(request.data.get("minute"))
 
-        if job_id not in ["indus_po_scraper", "scrape_and_store_in_redis"]:
+        if job_id not in JOB_FUNCTIONS:
             return Response({"error": "Invalid job_id"}, status=400)
 
         success, message = update_job_schedule(job_id, hour, minute)
@@ -2,6 +2,9 @@
 ASGI config for indusproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Long-lived endpoints such as the /api/events/ Server-Sent Events stream need to
+be served from this application (e.g. ``gunicorn -k uvicorn.workers.UvicornWorker
+indusproject.asgi:application``) rather than from the WSGI one.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,272 @@
+"""
+Warm Chromium pool owned by the long-running scheduler process.
+
+Playwright's async objects belong to the event loop that created them, so the
+pool runs its own loop in a background thread and scraping jobs are executed
+on it (`run_scrape_job`). An ERPEngine started on that loop leases an already
+launched browser instead of starting Playwright and Chromium itself:
+
+    start_browser_pool()                              # scheduler startup
+    run_scrape_job(scrape_po_job(...))                # from any job thread
+
+A lease is health checked before it is handed out (still connected and able to
+open a context) and replaced when the check fails. On release a browser is
+recycled once it has served BROWSER_RECYCLE_PAGES page loads or its process
+tree uses more than BROWSER_RECYCLE_RSS_MB of memory; the replacement is
+launched in the background. A slot whose relaunch fails keeps being relaunched
+with backoff, so the pool never shrinks, and a job that cannot get a browser
+within BROWSER_ACQUIRE_TIMEOUT seconds fails with BrowserPoolError instead of
+blocking its scheduler thread. Pooled browsers are shared by all jobs, so they use
+the launch settings of browser_profile.py (SCRAPER_HEADLESS); each job's request
+filtering still applies to the contexts it opens. Outside the scheduler (no pool
+started) jobs fall back to asyncio.run with a browser of their own.
+"""
+import os
+import asyncio
+import threading
+from playwright.async_api import async_playwright
+from .browser_profile import SCRAPER_HEADLESS, launch_browser
+from . import metrics
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_POOL_HEADLESS = SCRAPER_HEADLESS
+BROWSER_RECYCLE_PAGES = int(os.getenv("BROWSER_RECYCLE_PAGES", "500"))
+BROWSER_RECYCLE_RSS_MB = int(os.getenv("BROWSER_RECYCLE_RSS_MB", "1024"))
+BROWSER_ACQUIRE_TIMEOUT = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "600"))
+HEALTH_CHECK_TIMEOUT = 10
+RELAUNCH_BACKOFF_S = 5
+RELAUNCH_BACKOFF_MAX_S = 300
+
+_pool = None
+
+# ================= PROCESS MEMORY =================
+def _process_table():
+    """pid -> (ppid, rss_kb) from /proc; empty where /proc is not available."""
+    table = {}
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return table
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        rss = fields.get("VmRSS", "0 kB").split()[0]
+        table[pid] = (int(fields.get("PPid", "0").strip()), int(rss))
+    return table
+
+def _descendants(pid, table):
+    children = {}
+    for child, (parent, _) in table.items():
+        children.setdefault(parent, []).append(child)
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+def process_tree_rss_mb(pid):
+    """Resident memory of `pid` and all its descendants in MB, None when unknown."""
+    table = _process_table()
+    if pid is None or pid not in table:
+        return None
+    return sum(table[p][1] for p in [pid, *_descendants(pid, table)]) / 1024
+
+# ================= POOL =================
+class BrowserPoolError(Exception):
+    pass
+
+class PooledBrowser:
+    def __init__(self, browser, pid):
+        self.browser = browser
+        # Root Chromium process, for the memory threshold (None when unknown)
+        self.pid = pid
+        self.page_loads = 0
+        self.leases = 0
+
+class BrowserPool:
+    def __init__(self, size=BROWSER_POOL_SIZE, headless=BROWSER_POOL_HEADLESS,
+                 recycle_pages=BROWSER_RECYCLE_PAGES, recycle_rss_mb=BROWSER_RECYCLE_RSS_MB):
+        self.size = size
+        self.headless = headless
+        self.recycle_pages = recycle_pages
+        self.recycle_rss_mb = recycle_rss_mb
+        self.loop = None
+        self._thread = None
+        self._playwright = None
+        self._idle = None
+        self._browsers = set()
+        # Background relaunches; referenced so they are not garbage collected
+        self._tasks = set()
+
+    # ---- Lifecycle (called from the scheduler thread) ----
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        try:
+            self.run(self._start())
+        except BaseException:
+            # Close the browsers launched so far and the loop thread
+            self.stop()
+            raise
+        print(f"[POOL] Started {self.size} warm browsers")
+
+    def run(self, coro):
+        """Runs `coro` on the pool's loop and blocks the calling thread for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self):
+        if self.loop is None:
+            return
+        self.run(self._stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.loop = None
+        print("[POOL] Stopped")
+
+    async def _start(self):
+        self._playwright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(await self._launch())
+
+    async def _stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for pooled in list(self._browsers):
+            await self._close(pooled)
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    # ---- Browsers ----
+    async def _launch(self):
+        own_pid = os.getpid()
+        before = set(_descendants(own_pid, _process_table()))
+        browser = await launch_browser(self._playwright, self.headless)
+        table = _process_table()
+        new = set(_descendants(own_pid, table)) - before
+        roots = [pid for pid in new if table[pid][0] not in new]
+        pooled = PooledBrowser(browser, roots[0] if len(roots) == 1 else None)
+        self._browsers.add(pooled)
+        return pooled
+
+    async def _close(self, pooled):
+        self._browsers.discard(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            print(f"[POOL] Error closing browser: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _relaunch(self):
+        """Launches a browser into the idle queue, retrying with backoff until it succeeds."""
+        attempt = 0
+        while True:
+            try:
+                self._idle.put_nowait(await self._launch())
+                return
+            except Exception as e:
+                delay = min(RELAUNCH_BACKOFF_MAX_S, RELAUNCH_BACKOFF_S * 2 ** attempt)
+                print(f"[POOL] Could not launch replacement browser, retrying in {delay}s: {e}")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _replace(self, pooled):
+        await self._close(pooled)
+        await self._relaunch()
+
+    async def _healthy(self, pooled):
+        if not pooled.browser.is_connected():
+            return False
+        try:
+            context = await asyncio.wait_for(pooled.browser.new_context(), HEALTH_CHECK_TIMEOUT)
+            await context.close()
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, pooled):
+        if pooled.page_loads >= self.recycle_pages:
+            return f"{pooled.page_loads} page loads"
+        rss_mb = process_tree_rss_mb(pooled.pid)
+        if rss_mb is not None and rss_mb >= self.recycle_rss_mb:
+            return f"{rss_mb:.0f} MB resident"
+        return None
+
+    # ---- Leases (called on the pool's loop) ----
+    async def acquire(self, timeout=BROWSER_ACQUIRE_TIMEOUT):
+        """
+        Waits up to `timeout` seconds for an idle browser, relaunching it first when
+        it fails the health check. Raises BrowserPoolError when no browser is available.
+        """
+        try:
+            pooled = await asyncio.wait_for(self._idle.get(), timeout)
+        except asyncio.TimeoutError:
+            raise BrowserPoolError(f"No pooled browser became available within {timeout:g}s")
+        if not await self._healthy(pooled):
+            print("[POOL] Browser failed health check, relaunching")
+            await self._close(pooled)
+            try:
+                pooled = await self._launch()
+            except Exception as e:
+                # Keep the slot: it is relaunched in the background for later jobs
+                self._spawn(self._relaunch())
+                raise BrowserPoolError(f"Could not relaunch pooled browser: {e}") from e
+        pooled.leases += 1
+        return pooled
+
+    async def release(self, pooled, page_loads=0):
+        pooled.page_loads += page_loads
+        reason = self._needs_recycle(pooled)
+        if reason:
+            print(f"[POOL] Recycling browser after {pooled.leases} leases ({reason})")
+            self._spawn(self._replace(pooled))
+        else:
+            self._idle.put_nowait(pooled)
+
+# ================= PROCESS-WIDE POOL =================
+def start_browser_pool(**kwargs):
+    global _pool
+    if _pool is None:
+        pool = BrowserPool(**kwargs)
+        pool.start()
+        _pool = pool
+    return _pool
+
+def stop_browser_pool():
+    global _pool
+    if _pool is not None:
+        _pool.stop()
+        _pool = None
+
+def active_pool():
+    """The process pool when called from a coroutine running on its loop, else None."""
+    if _pool is None:
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return _pool if loop is _pool.loop else None
+
+def run_scrape_job(coro):
+    """
+    Runs a scraping coroutine on the warm pool when this process has one, otherwise
+    with asyncio.run. The job's metrics are flushed to Redis when it ends.
+    """
+    try:
+        if _pool is not None:
+            return _pool.run(coro)
+        return asyncio.run(coro)
+    finally:
+        metrics.flush()
@@ -0,0 +1,88 @@
+"""
+Lightweight browser profile for the scraping jobs.
+
+Chromium is launched headless with a trimmed set of flags, and every context a
+job opens routes its requests through the job's ScrapeProfile:
+
+- resource types in `blocked_types` are not downloaded. Images are answered with
+  a 1x1 GIF and stylesheets with an empty sheet, so elements keep a box and stay
+  "visible" for selectors such as img[title='Expand']; fonts and media are aborted.
+- sub-resources from hosts other than the ERP (analytics, CDNs, ...) are aborted
+  when `block_third_party` is set. Page navigations are never blocked, so SSO
+  redirects keep working.
+
+The defaults come from the environment (SCRAPER_HEADLESS, SCRAPER_BLOCK_RESOURCES,
+SCRAPER_BLOCK_THIRD_PARTY, SCRAPER_ALLOWED_HOSTS); a job can pass its own
+ScrapeProfile, e.g. ScrapeProfile(blocked_types=()) to load everything.
+"""
+import os, base64
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_list(name, default):
+    return tuple(v.strip() for v in os.getenv(name, default).split(",") if v.strip())
+
+SCRAPER_HEADLESS = os.getenv("SCRAPER_HEADLESS", "true").lower() == "true"
+SCRAPER_BLOCK_RESOURCES = _env_list("SCRAPER_BLOCK_RESOURCES", "image,font,stylesheet,media")
+SCRAPER_BLOCK_THIRD_PARTY = os.getenv("SCRAPER_BLOCK_THIRD_PARTY", "true").lower() == "true"
+SCRAPER_ALLOWED_HOSTS = _env_list("SCRAPER_ALLOWED_HOSTS", "")
+
+LAUNCH_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+_BLANK_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+# Blocked resource type -> stub response (None = abort the request)
+_STUBS = {
+    "image": {"status": 200, "content_type": "image/gif", "body": _BLANK_GIF},
+    "stylesheet": {"status": 200, "content_type": "text/css", "body": ""},
+}
+
+async def launch_browser(playwright, headless):
+    return await playwright.chromium.launch(headless=headless, args=LAUNCH_ARGS)
+
+def _host_allowed(host, allowed_hosts):
+    return any(host == allowed or host.endswith("." + allowed) for allowed in allowed_hosts)
+
+class ScrapeProfile:
+    def __init__(self, headless=SCRAPER_HEADLESS, blocked_types=SCRAPER_BLOCK_RESOURCES,
+                 block_third_party=SCRAPER_BLOCK_THIRD_PARTY, allowed_hosts=SCRAPER_ALLOWED_HOSTS):
+        self.headless = headless
+        self.blocked_types = frozenset(blocked_types)
+        self.block_third_party = block_third_party
+        self.allowed_hosts = tuple(allowed_hosts)
+
+    async def attach(self, context, first_party_url):
+        """Installs the request filter on `context`; `first_party_url`'s host is always allowed."""
+        if not self.blocked_types and not self.block_third_party:
+            return
+        allowed_hosts = (urlsplit(first_party_url).hostname or "", *self.allowed_hosts)
+
+        async def handle(route):
+            request = route.request
+            resource_type = request.resource_type
+            if resource_type in self.blocked_types:
+                stub = _STUBS.get(resource_type)
+                if stub:
+                    await route.fulfill(**stub)
+                else:
+                    await route.abort()
+                return
+            if (self.block_third_party and not request.is_navigation_request()
+                    and not _host_allowed(urlsplit(request.url).hostname or "", allowed_hosts)):
+                await route.abort()
+                return
+            await route.continue_()
+
+        await context.route("**/*", handle)
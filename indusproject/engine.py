@@ -0,0 +1,318 @@
+"""
+Async Playwright engine shared by the PO detail scraper (scrapper.py) and the
+PO status scraper (status_scrapper.py).
+
+The engine owns the browser, the logged-in context and the Orders page:
+
+    async with ERPEngine() as engine:
+        await engine.open_orders()                      # cached session or login
+        async for page_number, table in engine.paginate(max_pages=3):
+            ...                                         # extract_table() result per page
+        await engine.map_bounded(pos, job, concurrency=4)
+
+`map_bounded` runs `job(page, index, item)` for every item as asyncio tasks,
+at most `concurrency` at a time. Each running task holds one worker page; the
+Orders page is the first worker, extra workers get their own context seeded
+with the logged-in storage state, so no extra login is needed.
+
+Started on the scheduler's warm browser pool (see browser_pool.py) the engine
+leases a running browser and only closes the contexts it opened; elsewhere it
+launches and closes a browser of its own.
+
+Clicks and waits that may need retrying go through `click` / `wait_for`, which
+apply the run's adaptive timeouts, backoff and circuit breaker (resilience.py).
+Login, navigation, pagination and table extraction are timed as metrics spans.
+"""
+import os
+import asyncio
+from playwright.async_api import async_playwright, TimeoutError, Error as PlaywrightError
+from .browser_pool import active_pool
+from .browser_profile import ScrapeProfile, launch_browser
+from .credentials import *
+from .readiness import (
+    ORDERS_ROWS_SELECTOR, rows_signature, wait_for_ready, wait_for_rows_change, wait_for_network_settled
+)
+from .session_store import (
+    LOGIN_FORM_SELECTOR, SESSION_CHECK_SELECTOR, load_session, save_session, clear_session
+)
+from .table_extract import extract_table
+from .http_scraper import HttpScrapeError, build_client
+from .resilience import Resilience, CircuitOpenError
+from .metrics import span
+
+# Caps whatever concurrency a job asks for
+MAX_CONCURRENCY = int(os.getenv("SCRAPER_MAX_WORKERS", "4"))
+
+# "Next 25", or "Next N" on the page before the last one
+NEXT_PAGE_SELECTOR = "a.x49[title^='Next'], a:has-text('Next')"
+
+# ================= ENGINE =================
+class ERPEngine:
+    def __init__(self, profile=None, timeouts=None, login_url=ERP_LOGIN_URL,
+                 username=ERP_USERNAME, password=ERP_PASSWORD):
+        # Headless mode and request filtering, see browser_profile.py
+        self.profile = profile or ScrapeProfile()
+        # Per-step overrides of readiness.READINESS_TIMEOUTS
+        self.timeouts = timeouts or {}
+        self.login_url = login_url
+        self.username = username
+        self.password = password
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.orders_url = None
+        # Full page loads across all pages of this engine (pool recycling)
+        self.page_loads = 0
+        self._playwright = None
+        self._pool = None
+        self._lease = None
+        self._contexts = []
+        self.resilience = Resilience(self.timeouts)
+
+    async def __aenter__(self):
+        self._pool = active_pool()
+        if self._pool:
+            self._lease = await self._pool.acquire()
+            self.browser = self._lease.browser
+        else:
+            self._playwright = await async_playwright().start()
+            self.browser = await launch_browser(self._playwright, self.profile.headless)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._lease:
+            for context in self._contexts:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            await self._pool.release(self._lease, self.page_loads)
+            self._lease = None
+        elif self.browser:
+            await self.browser.close()
+        self.browser = None
+        self._contexts = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def new_page(self, **context_options):
+        """
+        A page in a new context of the engine's browser, with the profile's request
+        filter installed and its page loads counted for pool recycling.
+        """
+        context = await self.browser.new_context(**context_options)
+        self._contexts.append(context)
+        await self.profile.attach(context, self.login_url)
+        page = await context.new_page()
+        page.on("load", self._count_page_load)
+        return page
+
+    def _count_page_load(self, _page):
+        self.page_loads += 1
+
+    # ---- Resilient interactions ----
+    async def click(self, page, selector, step="click", wait_for_load=True):
+        """
+        Clicks `selector` once it is visible, retrying with the run's adaptive
+        timeouts. Returns False when it never became clickable.
+        """
+        async def action(timeout):
+            await page.wait_for_selector(selector, timeout=timeout)
+            await page.click(selector, timeout=timeout)
+
+        try:
+            await self.resilience.call(step, action)
+        except CircuitOpenError:
+            raise
+        except TimeoutError:
+            print(f"[WARNING] Gave up waiting for {selector}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Failed to click {selector}: {e}")
+            return False
+        if wait_for_load:
+            await wait_for_network_settled(page, step, self.timeouts.get(step))
+        return True
+
+    async def wait_for(self, page, selector, step, on_retry=None):
+        """
+        Waits for `selector`, retrying with the run's adaptive timeouts; `on_retry`
+        (e.g. a reload) is awaited before each new attempt. Returns False on failure.
+        """
+        async def action(timeout):
+            await page.wait_for_selector(selector, timeout=timeout)
+
+        try:
+            await self.resilience.call(step, action, on_retry)
+            return True
+        except CircuitOpenError:
+            raise
+        except TimeoutError:
+            print(f"[WARNING] Gave up waiting for {selector}")
+            return False
+        except Exception as e:
+            print(f"[ERROR] Error waiting for {selector}: {e}")
+            return False
+
+    # ---- Login / Orders ----
+    async def login(self, page):
+        with span("login"):
+            await page.goto(self.login_url)
+            await wait_for_ready(page, LOGIN_FORM_SELECTOR, "login", self.timeouts.get("login"))
+            await page.fill("input#usernameField", self.username)
+            await page.fill("input#passwordField", self.password)
+            await self.click(page, "button:has-text('Log In')", "login")
+            await wait_for_ready(page, "img[title='Expand']", "login", self.timeouts.get("login"))
+        print("[✓] Logged into ERP system")
+
+    async def navigate_to_orders(self, page):
+        with span("navigation"):
+            await self.click(page, "img[title='Expand']", "orders")
+            await self.click(page, "li >> text=Home Page", "orders")
+            await self.click(page, "a:has-text('Orders')", "orders")
+            await wait_for_ready(page, ORDERS_ROWS_SELECTOR, "orders", self.timeouts.get("orders"))
+
+    async def _reuse_session(self):
+        storage_state, orders_url = load_session()
+        if not storage_state:
+            return None
+        page = await self.new_page(storage_state=storage_state)
+        try:
+            with span("navigation"):
+                await page.goto(orders_url)
+                await wait_for_ready(page, SESSION_CHECK_SELECTOR, "orders", self.timeouts.get("orders"))
+            if not await page.query_selector(LOGIN_FORM_SELECTOR) and await page.query_selector(ORDERS_ROWS_SELECTOR):
+                print("[✓] Reused cached ERP session")
+                return page
+            print("[INFO] Cached ERP session rejected, logging in again")
+        except PlaywrightError as e:
+            # The cached Orders URL no longer loads: same as a rejected session
+            print(f"[INFO] Cached ERP session could not be checked, logging in again: {e}")
+        clear_session()
+        await page.context.close()
+        return None
+
+    async def open_orders(self):
+        """
+        Positions the engine's page on the Orders tab and returns it. Reuses the
+        cached session and Orders URL when the ERP still accepts them, otherwise
+        logs in and caches the new session.
+        """
+        page = await self._reuse_session()
+        if page is None:
+            page = await self.new_page()
+            await self.login(page)
+            await self.navigate_to_orders(page)
+            save_session(await page.context.storage_state(), page.url)
+        self.context = page.context
+        self.page = page
+        self.orders_url = page.url
+        return page
+
+    # ---- Orders table ----
+    async def paginate(self, page=None, max_pages=None, selector=ORDERS_ROWS_SELECTOR):
+        """
+        Async generator of (page_number, table) for the Orders table, following the
+        Next link until it is missing or disabled, or `max_pages` pages were read.
+        The caller may stop early by breaking out of the loop.
+        """
+        page = page or self.page
+        page_number = 1
+        while True:
+            await wait_for_ready(page, selector, "pagination", self.timeouts.get("pagination"))
+            with span("extraction"):
+                table = await extract_table(page, selector)
+            yield page_number, table
+            if max_pages is not None and page_number >= max_pages:
+                return
+
+            next_button = await page.query_selector(NEXT_PAGE_SELECTOR)
+            if not next_button or "disabled" in (await next_button.get_attribute("class") or "").lower():
+                return
+            with span("pagination"):
+                previous = await rows_signature(page, selector)
+                await next_button.click()
+                await wait_for_rows_change(page, previous, selector, timeout=self.timeouts.get("pagination"))
+            page_number += 1
+
+    # ---- Bounded tasks ----
+    async def new_worker_page(self):
+        """A page on the Orders tab in a fresh context that shares the logged-in session."""
+        page = await self.new_page(storage_state=await self.context.storage_state())
+        with span("navigation"):
+            await page.goto(self.orders_url)
+            await wait_for_network_settled(page, "orders", self.timeouts.get("orders"))
+        return page
+
+    async def map_bounded(self, items, job, concurrency=1):
+        """
+        Runs `await job(page, index, item)` for every item, at most `concurrency`
+        (capped at SCRAPER_MAX_WORKERS) at a time. Returns the results in item
+        order; a job that raises yields None. When the circuit breaker opens the
+        remaining jobs are cancelled and CircuitOpenError is raised.
+        """
+        items = list(items)
+        if not items:
+            return []
+        concurrency = max(1, min(concurrency, MAX_CONCURRENCY, len(items)))
+        semaphore = asyncio.Semaphore(concurrency)
+        pages = asyncio.Queue()
+        pages.put_nowait(self.page)
+        extra_pages = []
+        try:
+            for _ in range(concurrency - 1):
+                page = await self.new_worker_page()
+                extra_pages.append(page)
+                pages.put_nowait(page)
+
+            async def run(index, item):
+                async with semaphore:
+                    page = await pages.get()
+                    try:
+                        return await job(page, index, item)
+                    except CircuitOpenError:
+                        raise
+                    except Exception as e:
+                        print(f"[ENGINE] Task {index + 1}/{len(items)} failed: {e}")
+                        return None
+                    finally:
+                        pages.put_nowait(page)
+
+            if concurrency > 1:
+                print(f"[INFO] Running {len(items)} tasks with {concurrency} workers")
+            tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+            try:
+                return await asyncio.gather(*tasks)
+            except CircuitOpenError:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        finally:
+            for page in extra_pages:
+                await page.context.close()
+
+    # ---- HTTP mode ----
+    async def run_over_http(self, fetch):
+        """
+        Runs `fetch(client, orders_url)` in a worker thread with an httpx client that
+        carries the browser session's cookies and user agent, and returns its result.
+        Any failure surfaces as HttpScrapeError, so callers can fall back to the browser.
+        """
+        cookies = await self.context.cookies()
+        user_agent = await self.page.evaluate("navigator.userAgent")
+
+        def run():
+            with build_client(cookies, user_agent) as client:
+                return fetch(client, self.orders_url)
+
+        try:
+            return await asyncio.to_thread(run)
+        except HttpScrapeError:
+            raise
+        except Exception as e:
+            raise HttpScrapeError(f"HTTP client error: {type(e).__name__}: {e}") from e
@@ -0,0 +1,25 @@
+"""
+Redis pub/sub events published by the scrapers' storage layer.
+
+Every message on EVENTS_CHANNEL is a JSON object with a "type":
+    {"type": "po", "change": "inserted" | "updated", "po_number", "rev"}
+    {"type": "status", "po_number", "from", "to", "changed_at"}
+
+Publishers queue the PUBLISH commands on the same pipeline as the write they
+describe, so an event is only sent for data that was actually stored. The SSE
+endpoint in indusapi fans the events out to connected clients.
+"""
+import json
+
+EVENTS_CHANNEL = "indus_events"
+
+def queue_po_event(pipe, change, record):
+    pipe.publish(EVENTS_CHANNEL, json.dumps({
+        "type": "po",
+        "change": change,
+        "po_number": record["po_number"],
+        "rev": record.get("rev", ""),
+    }))
+
+def queue_status_event(pipe, transition):
+    pipe.publish(EVENTS_CHANNEL, json.dumps({"type": "status", **transition}))
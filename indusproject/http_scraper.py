@@ -0,0 +1,165 @@
+"""
+HTTP-only scraping of the ERP Orders list and PO detail pages.
+
+The ERP serves plain server-rendered HTML tables, so once a browser has logged
+in we export its cookies into a pooled httpx client and fetch pages directly,
+parsing them with lxml. Anything that cannot be fetched or parsed raises
+HttpScrapeError (or is returned as pending) so the caller can fall back to the
+browser for it.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import httpx
+from lxml import html as lxml_html
+
+from .table_extract import parse_line_items, parse_po_list, parse_status_rows
+
+HTTP_CONCURRENCY = int(os.getenv("HTTP_SCRAPER_CONCURRENCY", "8"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_SCRAPER_TIMEOUT", "30"))
+
+# Raw HTML has no implicit <tbody>, so these match rows at any depth
+ORDERS_ROWS_XPATH = "//span[@id='ResultRN1']//table//tr"
+PO_DETAIL_ROWS_XPATH = "//tr"
+# "Next 25", or "Next N" when fewer than 25 rows are left
+NEXT_PAGE_XPATH = "//a[starts-with(@title, 'Next') or contains(normalize-space(.), 'Next')]"
+CREATION_DATE_XPATH = "//span[contains(@id, 'PosOrderDateTime')]"
+LOGIN_FORM_XPATH = "//input[@id='usernameField' or @name='usernameField']"
+
+class HttpScrapeError(Exception):
+    pass
+
+def build_client(cookies, user_agent=None):
+    """Pooled httpx client carrying the cookies of a logged-in browser context."""
+    jar = httpx.Cookies()
+    for cookie in cookies:
+        jar.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+    headers = {"User-Agent": user_agent} if user_agent else {}
+    # httpx 0.13 follows redirects by default
+    return httpx.Client(
+        cookies=jar,
+        headers=headers,
+        timeout=HTTP_TIMEOUT,
+        pool_limits=httpx.PoolLimits(max_keepalive=HTTP_CONCURRENCY, max_connections=HTTP_CONCURRENCY)
+    )
+
+def _text(el):
+    return " ".join(el.text_content().split())
+
+def parse_html_table(tree, rows_xpath, base_url=""):
+    """lxml counterpart of table_extract.extract_table, returning the same shape."""
+    rows = tree.xpath(rows_xpath)
+    headers = []
+    for row in rows:
+        ths = row.xpath(".//th")
+        if ths:
+            headers = [_text(th) for th in ths]
+            break
+    if not headers:
+        headers = [_text(th) for th in tree.xpath("//thead//th | //table//th")]
+
+    links = []
+    for row in rows:
+        hrefs = row.xpath(".//a/@href")
+        links.append(urljoin(base_url, hrefs[0]) if hrefs else None)
+
+    return {
+        "headers": headers,
+        "rows": [[_text(td) for td in row.xpath(".//td")] for row in rows],
+        "links": links,
+    }
+
+def fetch_tree(client, url):
+    try:
+        response = client.get(url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        raise HttpScrapeError(f"GET {url} failed: {e}")
+    tree = lxml_html.fromstring(response.text)
+    if tree.xpath(LOGIN_FORM_XPATH):
+        raise HttpScrapeError(f"Session rejected while fetching {url}")
+    return tree, str(response.url)
+
+def _next_page_url(tree, base_url):
+    """URL of the next page, None on the last page. Raises if pagination needs JavaScript."""
+    links = tree.xpath(NEXT_PAGE_XPATH)
+    if not links or "disabled" in (links[0].get("class") or "").lower():
+        return None
+    href = links[0].get("href") or ""
+    if not href or href.startswith("javascript:") or href == "#":
+        raise HttpScrapeError("Next page link requires JavaScript")
+    return urljoin(base_url, href)
+
+def fetch_list_tables(client, orders_url, max_pages=None):
+    """
+    Yields the Orders result tables page by page (all pages when max_pages is None).
+    Pages are only fetched as the caller iterates, so breaking out stops pagination.
+    """
+    pages, url = 0, orders_url
+    while url and (max_pages is None or pages < max_pages):
+        tree, url = fetch_tree(client, url)
+        table = parse_html_table(tree, ORDERS_ROWS_XPATH, url)
+        if not table["rows"]:
+            if not pages:
+                raise HttpScrapeError("Orders table not found in page")
+            return
+        pages += 1
+        print(f"[HTTP] Orders page {pages}: {len(table['rows'])} rows")
+        yield table
+        url = _next_page_url(tree, url)
+
+def fetch_po_list(client, orders_url, max_pages, select=None):
+    """
+    Collected PO entries over HTTP. `select(entries) -> (kept, stop)` filters each
+    page and can end pagination early. Raises HttpScrapeError when the list cannot be parsed.
+    """
+    entries = []
+    for table in fetch_list_tables(client, orders_url, max_pages):
+        page_entries, stop = select(parse_po_list(table)) if select else (parse_po_list(table), False)
+        entries.extend(page_entries)
+        if stop:
+            break
+    return entries
+
+def fetch_status_records(client, orders_url, max_pages=None):
+    """(po_number, status) records over HTTP. Raises HttpScrapeError when the list cannot be parsed."""
+    records = []
+    for table in fetch_list_tables(client, orders_url, max_pages):
+        records.extend(parse_status_rows(table))
+    return records
+
+def fetch_po_detail(client, po):
+    """
+    Fills in the raw line items and creation_date of `po` from its detail page
+    (grouping is left to the caller). Returns False on failure.
+    """
+    if not po.get("detail_url"):
+        return False
+    try:
+        tree, url = fetch_tree(client, po["detail_url"])
+    except HttpScrapeError as e:
+        print(f"[HTTP] {e}")
+        return False
+
+    date_elems = tree.xpath(CREATION_DATE_XPATH)
+    if not date_elems:
+        print(f"[HTTP] PO {po['po_number']} detail page could not be parsed")
+        return False
+
+    po["items"] = parse_line_items(parse_html_table(tree, PO_DETAIL_ROWS_XPATH, url), po["po_number"])
+    po["creation_date"] = _text(date_elems[0])
+    return True
+
+def fetch_po_details(client, po_numbers, concurrency=HTTP_CONCURRENCY):
+    """
+    Fetches PO detail pages concurrently. Returns the POs that could not be
+    scraped over HTTP, in their original order, for the browser fallback.
+    """
+    if not po_numbers:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(po_numbers)))) as executor:
+        done = list(executor.map(lambda po: fetch_po_detail(client, po), po_numbers))
+    pending = [po for po, ok in zip(po_numbers, done) if not ok]
+    print(f"[HTTP] Scraped {len(po_numbers) - len(pending)}/{len(po_numbers)} PO details over HTTP")
+    return pending
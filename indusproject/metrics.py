@@ -0,0 +1,142 @@
+"""
+Scraper and API metrics in Prometheus form, aggregated in Redis.
+
+The scrapers run in the scheduler process and the API in gunicorn workers, so
+every process buffers its counter increments and histogram observations in
+memory and adds them to two Redis hashes at most every FLUSH_INTERVAL seconds
+(and at the end of every scraping job). `/metrics` renders those hashes in the
+Prometheus text format; the fields already are the exposition series names:
+
+    indus_metrics:counters    hash    'scraper_retries_total{step="detail"}' -> value
+    indus_metrics:histograms  hash    'scraper_stage_seconds_bucket{stage="login",le="5"}' -> count, ..._sum, ..._count
+
+Instrumented code uses:
+
+    with span("detail"):                      # scraper_stage_seconds{stage="detail"}
+        ...
+    inc("scraper_retries_total", step="detail")
+    observe("api_request_duration_seconds", elapsed, view="get_po_data")
+"""
+import re, time, threading
+from contextlib import contextmanager
+from .redis_connection import get_redis
+
+COUNTERS_KEY = "indus_metrics:counters"
+HISTOGRAMS_KEY = "indus_metrics:histograms"
+FLUSH_INTERVAL = 5.0
+
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+API_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name -> (type, help, buckets)
+METRICS = {
+    "scraper_stage_seconds": ("histogram", "Duration of scraping stages", STAGE_BUCKETS),
+    "scraper_retries_total": ("counter", "ERP interactions retried after a timeout", None),
+    "scraper_timeouts_total": ("counter", "ERP interaction attempts that timed out", None),
+    "scraper_failed_pos_total": ("counter", "POs whose details could not be scraped", None),
+    "api_request_duration_seconds": ("histogram", "API request latency", API_BUCKETS),
+}
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_last_flush = time.monotonic()
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def _add(buffer, field, amount):
+    buffer[field] = buffer.get(field, 0) + amount
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        _add(_counters, _series(name, labels), amount)
+    _maybe_flush()
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    with _lock:
+        # Every bucket is written, so a series exposes all its bounds from the first observation
+        for bound in buckets:
+            _add(_histograms, _series(f"{name}_bucket", {**labels, "le": bound}), 1 if value <= bound else 0)
+        _add(_histograms, _series(f"{name}_bucket", {**labels, "le": "+Inf"}), 1)
+        _add(_histograms, _series(f"{name}_sum", labels), value)
+        _add(_histograms, _series(f"{name}_count", labels), 1)
+    _maybe_flush()
+
+@contextmanager
+def span(stage):
+    """Times the block into scraper_stage_seconds{stage=...}, also when it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("scraper_stage_seconds", time.perf_counter() - started, stage=stage)
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+def flush():
+    """Adds the buffered metrics to Redis. Metrics are dropped rather than failing the caller."""
+    global _counters, _histograms, _last_flush
+    with _lock:
+        counters, histograms = _counters, _histograms
+        _counters, _histograms = {}, {}
+        _last_flush = time.monotonic()
+    if not counters and not histograms:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for field, amount in counters.items():
+            pipe.hincrbyfloat(COUNTERS_KEY, field, amount)
+        for field, amount in histograms.items():
+            pipe.hincrbyfloat(HISTOGRAMS_KEY, field, amount)
+        pipe.execute()
+    except Exception as e:
+        print(f"[METRICS] Could not flush metrics: {e}")
+
+# ================= EXPOSITION =================
+_SERIES_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?$')
+_LE_RE = re.compile(r',?le="([^"]*)"')
+
+def _family(series_name):
+    for suffix in ("_bucket", "_sum", "_count"):
+        if series_name.endswith(suffix) and series_name[:-len(suffix)] in METRICS:
+            return series_name[:-len(suffix)]
+    return series_name
+
+def _sort_key(field):
+    name, labels = _SERIES_RE.match(field).groups()
+    labels = labels or ""
+    le = _LE_RE.search(labels)
+    bound = float("inf") if le is None or le.group(1) == "+Inf" else float(le.group(1))
+    return (_LE_RE.sub("", labels), name, bound)
+
+def _format_value(raw):
+    value = float(raw)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def render_prometheus():
+    """The aggregated metrics in the Prometheus text exposition format (version 0.0.4)."""
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.hgetall(COUNTERS_KEY)
+    pipe.hgetall(HISTOGRAMS_KEY)
+    stored = {}
+    for raw in pipe.execute():
+        stored.update({k.decode(): v.decode() for k, v in raw.items()})
+
+    families = {}
+    for field, value in stored.items():
+        if _SERIES_RE.match(field):
+            families.setdefault(_family(_SERIES_RE.match(field).group(1)), []).append((field, value))
+
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for field, value in sorted(families.get(name, []), key=lambda item: _sort_key(item[0])):
+            lines.append(f"{field} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
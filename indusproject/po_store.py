@@ -0,0 +1,382 @@
+"""
+Per-PO Redis storage for scraped purchase orders.
+
+Layout:
+    indus_po_records              hash    po_number -> PO record JSON
+    indus_po_by_date              zset    po_number scored by order date (epoch seconds)
+    indus_po_by_number            zset    po_number, all scored 0 (lexical prefix lookups)
+    indus_po_by_site:<site_id>    set     po_numbers with a line item for the site
+    indus_po_by_project:<id>      set     po_numbers with a line item for the project
+    indus_po_watermark            hash    po_number -> rev of the stored record (identity index)
+    indus_po_records:version      string  bumped on every write (API response cache / ETag)
+    indus_po_changes              stream  capped feed of inserted / updated POs
+
+Writes are pipelined upserts of just the changed POs, and readers fetch
+records by po_number or walk the date index in chunks, so neither side has
+to parse the whole history. `ingest_records` deduplicates a scraped batch on
+(po_number, rev) against the identity index, so its cost depends only on the
+batch size, and appends every inserted or updated PO to a capped change
+stream that consumers read incrementally with `read_changes`. `query_records`
+serves filtered, cursor-paginated reads from the indexes. `migrate_legacy_blob`
+converts the old single-key `indus_po_data` JSON blob into this layout,
+`reindex` rebuilds the indexes:
+
+    python -m indusproject.po_store migrate
+    python -m indusproject.po_store reindex
+"""
+import os, sys, json, uuid, bisect, datetime
+from dateutil import parser as date_parser
+from .redis_connection import get_redis
+from .events import queue_po_event
+
+PO_RECORDS_KEY = "indus_po_records"
+PO_BY_DATE_KEY = "indus_po_by_date"
+PO_BY_NUMBER_KEY = "indus_po_by_number"
+PO_VERSION_KEY = "indus_po_records:version"
+PO_REVISION_KEY = "indus_po_watermark"
+PO_STREAM_KEY = "indus_po_changes"
+PO_STREAM_MAXLEN = int(os.getenv("PO_STREAM_MAXLEN", "10000"))
+SITE_INDEX_KEY = "indus_po_by_site:{}"
+PROJECT_INDEX_KEY = "indus_po_by_project:{}"
+QUERY_TMP_KEY = "indus_po_query:{}"
+LEGACY_BLOB_KEY = "indus_po_data"
+LEGACY_BACKUP_KEY = "indus_po_data_legacy"
+
+WRITE_CHUNK_SIZE = 500
+QUERY_TMP_TTL = 30
+
+def parse_date(value):
+    """Epoch seconds for an ERP date string (day first, e.g. 05-JAN-2025), None when it cannot be parsed."""
+    if not value:
+        return None
+    try:
+        return date_parser.parse(value, dayfirst=True).timestamp()
+    except (ValueError, OverflowError):
+        return None
+
+def parse_iso_date(value):
+    """Epoch seconds for an ISO 8601 date or datetime from API input, None when it is not one."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(str(value)).timestamp()
+    except (ValueError, OverflowError):
+        return None
+
+def parse_iso_end_date(value):
+    """
+    Upper bound for an ISO `date_to`, None when it is not one. A datetime is
+    inclusive; a plain date covers that whole day, returned as the exclusive
+    score bound "(<next midnight>" that zpage / ZCOUNT accept.
+    """
+    try:
+        day = datetime.date.fromisoformat(str(value))
+    except ValueError:
+        return parse_iso_date(value)
+    next_midnight = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time())
+    return f"({next_midnight.timestamp()!r}"
+
+def order_date_score(record):
+    """Epoch seconds of the PO's order (or creation) date, 0 when it cannot be parsed."""
+    return parse_date(record.get("order_date") or record.get("creation_date")) or 0
+
+def _index_keys(record):
+    keys = set()
+    for project in record.get("project") or []:
+        if project.get("site_id"):
+            keys.add(SITE_INDEX_KEY.format(project["site_id"]))
+        if project.get("project_id"):
+            keys.add(PROJECT_INDEX_KEY.format(project["project_id"]))
+    return keys
+
+def is_newer_revision(rev, stored_rev):
+    """Numeric revisions compare as numbers, anything else as text."""
+    if rev.isdigit() and stored_rev.isdigit():
+        return int(rev) > int(stored_rev)
+    return rev > stored_rev
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def upsert_records(records, changes=None):
+    """
+    Inserts or replaces the given PO records and their index entries, one atomic
+    pipeline per chunk. `changes` (po_number -> "inserted" / "updated") also
+    appends those records to the change stream and publishes a "po" event for
+    each of them in the same pipeline.
+    """
+    redis_client = get_redis()
+    records = [r for r in records if r.get("po_number")]
+    for chunk in _chunks(records, WRITE_CHUNK_SIZE):
+        previous = redis_client.hmget(PO_RECORDS_KEY, [r["po_number"] for r in chunk])
+        pipe = redis_client.pipeline(transaction=True)
+        for record, old in zip(chunk, previous):
+            new_keys = _index_keys(record)
+            old_keys = _index_keys(json.loads(old)) if old else set()
+            for key in old_keys - new_keys:
+                pipe.srem(key, record["po_number"])
+            for key in new_keys:
+                pipe.sadd(key, record["po_number"])
+        pipe.hset(PO_RECORDS_KEY, mapping={r["po_number"]: json.dumps(r) for r in chunk})
+        pipe.zadd(PO_BY_DATE_KEY, {r["po_number"]: order_date_score(r) for r in chunk})
+        pipe.zadd(PO_BY_NUMBER_KEY, {r["po_number"]: 0 for r in chunk})
+        pipe.hset(PO_REVISION_KEY, mapping={r["po_number"]: r.get("rev", "") for r in chunk})
+        for record in chunk:
+            if changes and record["po_number"] in changes:
+                pipe.xadd(PO_STREAM_KEY, {
+                    "change": changes[record["po_number"]],
+                    "po_number": record["po_number"],
+                    "rev": record.get("rev", ""),
+                    "data": json.dumps(record),
+                }, maxlen=PO_STREAM_MAXLEN, approximate=True)
+                queue_po_event(pipe, changes[record["po_number"]], record)
+        pipe.incr(PO_VERSION_KEY)
+        pipe.execute()
+    return len(records)
+
+def ingest_records(records):
+    """
+    Upserts a scraped batch keyed on (po_number, rev): unknown POs are inserted,
+    POs with a newer revision than the stored one replace it, and the rest are
+    left untouched. Returns {"inserted": [...], "updated": [...], "unchanged": count}.
+    """
+    # Within the batch keep the newest revision of each PO
+    latest = {}
+    for record in records:
+        po_number = record.get("po_number")
+        if not po_number:
+            continue
+        current = latest.get(po_number)
+        if current is None or is_newer_revision(record.get("rev", ""), current.get("rev", "")):
+            latest[po_number] = record
+
+    batch = list(latest.values())
+    stored_revs = get_redis().hmget(PO_REVISION_KEY, [r["po_number"] for r in batch]) if batch else []
+
+    inserted, updated = [], []
+    for record, stored_rev in zip(batch, stored_revs):
+        if stored_rev is None:
+            inserted.append(record)
+        elif is_newer_revision(record.get("rev", ""), stored_rev.decode()):
+            updated.append(record)
+
+    changes = {r["po_number"]: "inserted" for r in inserted}
+    changes.update({r["po_number"]: "updated" for r in updated})
+    upsert_records(inserted + updated, changes)
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": len(batch) - len(inserted) - len(updated),
+    }
+
+def count_records():
+    return get_redis().zcard(PO_BY_DATE_KEY)
+
+def get_records(po_numbers):
+    """Records for the given po_numbers, in the same order, skipping unknown ones."""
+    if not po_numbers:
+        return []
+    redis_client = get_redis()
+    return [json.loads(raw) for raw in redis_client.hmget(PO_RECORDS_KEY, list(po_numbers)) if raw]
+
+def iter_raw_chunks(chunk_size=WRITE_CHUNK_SIZE):
+    """Yields lists of stored record JSON (bytes) in order-date order, `chunk_size` records at a time."""
+    redis_client = get_redis()
+    start = 0
+    while True:
+        po_numbers = redis_client.zrange(PO_BY_DATE_KEY, start, start + chunk_size - 1)
+        if not po_numbers:
+            return
+        yield [raw for raw in redis_client.hmget(PO_RECORDS_KEY, po_numbers) if raw]
+        start += chunk_size
+
+def iter_records(chunk_size=WRITE_CHUNK_SIZE):
+    """Yields every stored record in order-date order, reading `chunk_size` at a time."""
+    for chunk in iter_raw_chunks(chunk_size):
+        yield from (json.loads(raw) for raw in chunk)
+
+def load_all_records():
+    return list(iter_records())
+
+def _stream_id(entry_id):
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+def read_changes(last_id="0-0", count=100):
+    """
+    Change stream entries after `last_id`, oldest first. Returns (changes, last_id,
+    truncated); truncated means entries after `last_id` were already trimmed off
+    the capped stream, so the consumer missed changes and should do a full reload.
+    """
+    redis_client = get_redis()
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.xrange(PO_STREAM_KEY, "-", "+", count=1)
+    pipe.xread({PO_STREAM_KEY: last_id}, count=count)
+    first, result = pipe.execute()
+
+    truncated = False
+    if first and _stream_id(last_id) != (0, 0) and _stream_id(first[0][0].decode()) > _stream_id(last_id):
+        # The oldest retained entry is newer than the consumer's position
+        truncated = not redis_client.xrange(PO_STREAM_KEY, last_id, last_id)
+    entries = result[0][1] if result else []
+
+    changes = []
+    for entry_id, fields in entries:
+        changes.append({
+            "id": entry_id.decode(),
+            "change": fields[b"change"].decode(),
+            "po_number": fields[b"po_number"].decode(),
+            "rev": fields[b"rev"].decode(),
+            "record": json.loads(fields[b"data"]),
+        })
+    return changes, (changes[-1]["id"] if changes else last_id), truncated
+
+def encode_cursor(score, member):
+    return f"{score!r}:{member}"
+
+def parse_cursor(cursor):
+    """(score, member) of a zpage cursor, None when it is malformed."""
+    score, sep, member = str(cursor).partition(":")
+    if not sep or not member:
+        return None
+    try:
+        return float(score), member
+    except ValueError:
+        return None
+
+def _cursor_rank(redis_client, key, score, member):
+    """
+    Rank of the first member after position (score, member). Exact also when the
+    cursor member has been re-scored or removed since the previous page.
+    """
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zscore(key, member)
+    pipe.zrank(key, member)
+    pipe.zcount(key, "-inf", f"({score!r}")
+    current, rank, before = pipe.execute()
+    if current == score:
+        return rank + 1
+    # Members with equal scores are ordered by their bytes
+    same_score = redis_client.zrangebyscore(key, score, score)
+    return before + bisect.bisect_right(same_score, member.encode())
+
+def zpage(key, min_score=None, max_score=None, cursor=None, limit=None):
+    """
+    One page of members of sorted set `key` within [min_score, max_score] (an
+    exclusive bound may be given in Redis form, e.g. "(100"), in
+    score order, starting after `cursor`. The cursor is the (score, member)
+    position of the previous page's last member, so members that are re-scored
+    between two pages never make the next page skip ahead. Uses ranks and score
+    counts only, so the cost does not depend on how many members precede the page.
+    Returns (members, next_cursor); next_cursor is None on the last page.
+    Raises ValueError for a malformed cursor.
+    """
+    redis_client = get_redis()
+    start = 0
+    if min_score is not None:
+        start = redis_client.zcount(key, "-inf", f"({min_score}")
+    if cursor:
+        position = parse_cursor(cursor)
+        if position is None:
+            raise ValueError(f"Invalid cursor {cursor!r}")
+        start = max(start, _cursor_rank(redis_client, key, *position))
+
+    # Rank of the last member in range; -1 (Redis' "last member") when unbounded
+    end = redis_client.zcount(key, "-inf", max_score) - 1 if max_score is not None else None
+    if end is not None and end < start:
+        return [], None
+    if limit is not None:
+        stop = start + limit  # one extra member tells whether there is a next page
+        end = stop if end is None else min(end, stop)
+    if end is None:
+        end = -1
+
+    members = redis_client.zrange(key, start, end, withscores=True)
+    next_cursor = None
+    if limit is not None and len(members) > limit:
+        members = members[:limit]
+        next_cursor = encode_cursor(members[-1][1], members[-1][0].decode())
+    return [member.decode() for member, _ in members], next_cursor
+
+def query_records(date_from=None, date_to=None, po_prefix=None, site_id=None,
+                  project_id=None, cursor=None, limit=None):
+    """
+    Filtered, cursor-paginated read ordered by order date. Filters are resolved
+    in Redis by intersecting the date index with the site / project / prefix
+    indexes into a short-lived temporary key. Returns (records, next_cursor).
+    """
+    redis_client = get_redis()
+    filter_keys, tmp_keys = [], []
+    if site_id:
+        filter_keys.append(SITE_INDEX_KEY.format(site_id))
+    if project_id:
+        filter_keys.append(PROJECT_INDEX_KEY.format(project_id))
+
+    try:
+        if po_prefix:
+            prefix = po_prefix.encode()
+            matches = redis_client.zrangebylex(PO_BY_NUMBER_KEY, b"[" + prefix, b"[" + prefix + b"\xff")
+            if not matches:
+                return [], None
+            prefix_key = QUERY_TMP_KEY.format(uuid.uuid4().hex)
+            tmp_keys.append(prefix_key)
+            pipe = redis_client.pipeline()
+            pipe.sadd(prefix_key, *matches)
+            pipe.expire(prefix_key, QUERY_TMP_TTL)
+            pipe.execute()
+            filter_keys.append(prefix_key)
+
+        source = PO_BY_DATE_KEY
+        if filter_keys:
+            source = QUERY_TMP_KEY.format(uuid.uuid4().hex)
+            tmp_keys.append(source)
+            # Weight 0 keeps the order-date score from the date index
+            weights = {PO_BY_DATE_KEY: 1, **{key: 0 for key in filter_keys}}
+            pipe = redis_client.pipeline()
+            pipe.zinterstore(source, weights)
+            pipe.expire(source, QUERY_TMP_TTL)
+            pipe.execute()
+
+        po_numbers, next_cursor = zpage(source, date_from, date_to, cursor, limit)
+        return get_records(po_numbers), next_cursor
+    finally:
+        if tmp_keys:
+            redis_client.delete(*tmp_keys)
+
+def reindex():
+    """Rebuilds the site / project / po_number / revision indexes of every stored record."""
+    redis_client = get_redis()
+    indexed = 0
+    for chunk in _chunks(load_all_records(), WRITE_CHUNK_SIZE):
+        pipe = redis_client.pipeline()
+        for record in chunk:
+            for key in _index_keys(record):
+                pipe.sadd(key, record["po_number"])
+        pipe.zadd(PO_BY_NUMBER_KEY, {r["po_number"]: 0 for r in chunk})
+        pipe.hset(PO_REVISION_KEY, mapping={r["po_number"]: r.get("rev", "") for r in chunk})
+        pipe.execute()
+        indexed += len(chunk)
+    print(f"[REINDEX] Indexed {indexed} records")
+    return indexed
+
+def migrate_legacy_blob():
+    """Moves the legacy `indus_po_data` blob into the per-PO layout, keeping a backup of the blob."""
+    redis_client = get_redis()
+    raw = redis_client.get(LEGACY_BLOB_KEY)
+    if not raw:
+        print(f"[MIGRATE] No '{LEGACY_BLOB_KEY}' blob to migrate")
+        return 0
+    migrated = upsert_records(json.loads(raw))
+    redis_client.rename(LEGACY_BLOB_KEY, LEGACY_BACKUP_KEY)
+    print(f"[MIGRATE] Migrated {migrated} records, blob kept as '{LEGACY_BACKUP_KEY}'")
+    return migrated
+
+# -------------------- Standalone --------------------
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate_legacy_blob()
+    elif sys.argv[1:] == ["reindex"]:
+        reindex()
+    else:
+        print("Usage: python -m indusproject.po_store migrate|reindex")
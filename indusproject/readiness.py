@@ -0,0 +1,92 @@
+"""
+Event-driven readiness helpers shared by both ERP scrapers.
+
+Instead of sleeping for a fixed time, wait for the condition that actually
+means "the page is ready": a selector appearing, the rows of a results table
+changing, or the network settling after a request. Every wait has a per-step
+timeout; when it expires we fall back to a short bounded wait and carry on,
+so a slow ERP degrades to the old behaviour instead of failing the run.
+
+All helpers take playwright.async_api pages (see engine.ERPEngine).
+"""
+from playwright.async_api import TimeoutError
+from .metrics import inc
+
+# Per-step timeouts in milliseconds
+READINESS_TIMEOUTS = {
+    "login": 30000,
+    "orders": 30000,
+    "pagination": 20000,
+    "search": 15000,
+    "detail": 30000,
+}
+
+# Bounded blind wait used when a readiness condition times out
+FALLBACK_WAIT_MS = 2000
+
+ORDERS_ROWS_SELECTOR = "span#ResultRN1 table tbody tr"
+
+# Returns a signature of the rows matched by `selector`. With `previous` set it
+# returns false until the signature differs, so it doubles as a wait predicate.
+_ROWS_SIGNATURE_JS = """
+([selector, previous]) => {
+    const rows = document.querySelectorAll(selector);
+    if (!rows.length) return false;
+    const sig = rows.length + '|' + rows[0].innerText + '|' + rows[rows.length - 1].innerText;
+    if (previous === null) return sig;
+    return sig !== previous ? sig : false;
+}
+"""
+
+def _timeout(step, timeout):
+    return timeout if timeout is not None else READINESS_TIMEOUTS.get(step, 30000)
+
+async def rows_signature(page, selector=ORDERS_ROWS_SELECTOR):
+    try:
+        return await page.evaluate(_ROWS_SIGNATURE_JS, [selector, None]) or None
+    except Exception:
+        return None
+
+async def wait_for_ready(page, selector, step, timeout=None):
+    """Waits for `selector` to appear. Returns False (after a fallback wait) on timeout."""
+    try:
+        await page.wait_for_selector(selector, timeout=_timeout(step, timeout))
+        return True
+    except TimeoutError:
+        inc("scraper_timeouts_total", step=step)
+        print(f"[READINESS] '{step}': {selector} not ready, falling back to {FALLBACK_WAIT_MS}ms wait")
+        await page.wait_for_timeout(FALLBACK_WAIT_MS)
+        return False
+
+async def wait_for_rows_change(page, previous, selector=ORDERS_ROWS_SELECTOR, step="pagination", timeout=None):
+    """Waits until the rows matched by `selector` differ from the `previous` signature."""
+    try:
+        await page.wait_for_function(_ROWS_SIGNATURE_JS, arg=[selector, previous], timeout=_timeout(step, timeout))
+        return True
+    except TimeoutError:
+        inc("scraper_timeouts_total", step=step)
+        print(f"[READINESS] '{step}': rows did not change, falling back to {FALLBACK_WAIT_MS}ms wait")
+        await page.wait_for_timeout(FALLBACK_WAIT_MS)
+        return False
+
+async def wait_for_network_settled(page, step, timeout=None):
+    """Waits for the network to go idle after a navigation or form post."""
+    try:
+        await page.wait_for_load_state("networkidle", timeout=_timeout(step, timeout))
+        return True
+    except TimeoutError:
+        inc("scraper_timeouts_total", step=step)
+        print(f"[READINESS] '{step}': network did not settle, falling back to {FALLBACK_WAIT_MS}ms wait")
+        await page.wait_for_timeout(FALLBACK_WAIT_MS)
+        return False
+
+async def click_and_wait_for_response(page, selector, url_part, step, timeout=None):
+    """Clicks `selector` and waits for the response of the request it triggers."""
+    try:
+        async with page.expect_response(lambda r: url_part in r.url, timeout=_timeout(step, timeout)):
+            await page.click(selector)
+        return True
+    except TimeoutError:
+        inc("scraper_timeouts_total", step=step)
+        print(f"[READINESS] '{step}': no response for {url_part}, falling back to network idle")
+        return await wait_for_network_settled(page, step, timeout)
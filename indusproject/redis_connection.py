@@ -0,0 +1,60 @@
+"""
+Shared Redis connections for the scrapers, the scheduler and the API views.
+
+All sync clients are built on one process-wide ConnectionPool, so callers can
+simply call `get_redis()` wherever they need Redis instead of opening a new
+connection. Every connection has socket timeouts and periodic health checks, so
+a slow or restarted Redis surfaces as an error rather than a hung job. redis-py
+resets the pool after a fork, which keeps it safe under gunicorn.
+
+Async code (Playwright jobs, SSE views) uses `get_async_redis()`, which keeps
+one pool per event loop because asyncio connections cannot be shared across loops.
+"""
+import os, asyncio, threading, weakref
+from dotenv import load_dotenv
+from redis import Redis, ConnectionPool
+from redis import asyncio as redis_asyncio
+
+load_dotenv()
+
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = int(os.getenv("REDIS_PORT"))
+REDIS_DB = int(os.getenv("REDIS_DB"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "3"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_async_pools = weakref.WeakKeyDictionary()
+
+def _pool_options():
+    return {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "db": REDIS_DB,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "retry_on_timeout": True,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+    }
+
+def get_redis():
+    """Sync client on the shared connection pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(**_pool_options())
+    return Redis(connection_pool=_pool)
+
+def get_async_redis():
+    """asyncio client on the pool of the running event loop. Must be called from inside the loop."""
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = redis_asyncio.ConnectionPool(**_pool_options())
+        _async_pools[loop] = pool
+    return redis_asyncio.Redis(connection_pool=pool)
@@ -0,0 +1,119 @@
+"""
+Retry policy shared by every ERP interaction of a scraping run.
+
+- Adaptive timeouts: the latency of every successful step is tracked per page
+  type (an exponentially weighted moving average). A step's timeout is a
+  multiple of its typical latency, bounded below by MIN_TIMEOUT_MS and above by
+  the fixed per-step timeout in readiness.READINESS_TIMEOUTS, and doubles with
+  each retry. Until a step has been observed the fixed timeout is used.
+- Exponential backoff with full jitter between attempts.
+- A per-run circuit breaker: after CIRCUIT_BREAKER_THRESHOLD consecutive failed
+  operations every further call raises CircuitOpenError, so a run against an
+  ERP that is down stops within minutes instead of timing out PO after PO.
+
+Each ERPEngine owns one Resilience instance for its run.
+"""
+import os
+import time
+import random
+import asyncio
+from dotenv import load_dotenv
+from playwright.async_api import TimeoutError
+from .readiness import READINESS_TIMEOUTS
+from .metrics import inc
+
+load_dotenv()
+
+RETRY_ATTEMPTS = int(os.getenv("SCRAPER_RETRY_ATTEMPTS", "3"))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("SCRAPER_CIRCUIT_BREAKER_THRESHOLD", "8"))
+
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 8.0
+# Timeout = LATENCY_FACTOR x typical latency, within [MIN_TIMEOUT_MS, step ceiling]
+LATENCY_FACTOR = 4
+MIN_TIMEOUT_MS = 3000
+EWMA_ALPHA = 0.3
+DEFAULT_CEILING_MS = 30000
+
+class CircuitOpenError(Exception):
+    pass
+
+def backoff_delay(attempt, base=BACKOFF_BASE_S, cap=BACKOFF_MAX_S):
+    """Full-jitter exponential backoff in seconds before retry number `attempt + 1`."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class LatencyTracker:
+    def __init__(self, ceilings=None):
+        self.ceilings = {**READINESS_TIMEOUTS, **(ceilings or {})}
+        self._ewma = {}
+
+    def observe(self, step, elapsed_ms):
+        previous = self._ewma.get(step)
+        self._ewma[step] = elapsed_ms if previous is None else EWMA_ALPHA * elapsed_ms + (1 - EWMA_ALPHA) * previous
+
+    def timeout(self, step, attempt=0):
+        """Timeout in ms for `step` on retry number `attempt` (0 = first try)."""
+        ceiling = self.ceilings.get(step, DEFAULT_CEILING_MS)
+        typical = self._ewma.get(step)
+        if typical is None:
+            return ceiling
+        return int(min(ceiling, max(MIN_TIMEOUT_MS, typical * LATENCY_FACTOR) * 2 ** attempt))
+
+class CircuitBreaker:
+    def __init__(self, threshold=CIRCUIT_BREAKER_THRESHOLD):
+        self.threshold = threshold
+        self.failures = 0
+        self.is_open = False
+
+    def check(self):
+        if self.is_open:
+            raise CircuitOpenError(f"ERP circuit open after {self.failures} consecutive failures")
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, what):
+        self.failures += 1
+        if not self.is_open and self.failures >= self.threshold:
+            self.is_open = True
+            print(f"[CIRCUIT] Opened after {self.failures} consecutive failures (last: {what}), stopping run")
+
+class Resilience:
+    def __init__(self, ceilings=None, attempts=RETRY_ATTEMPTS, breaker_threshold=CIRCUIT_BREAKER_THRESHOLD):
+        self.latency = LatencyTracker(ceilings)
+        self.breaker = CircuitBreaker(breaker_threshold)
+        self.attempts = attempts
+        self.retries = 0
+        self.timeouts = 0
+
+    async def call(self, step, action, on_retry=None):
+        """
+        Runs `await action(timeout_ms)` with the adaptive timeout of `step`, retrying
+        on playwright TimeoutError with jittered backoff (`on_retry` is awaited before
+        each new attempt). Returns the action's result; after the last attempt the
+        TimeoutError is re-raised and counted against the circuit breaker.
+        """
+        last_error = None
+        for attempt in range(self.attempts):
+            self.breaker.check()
+            timeout = self.latency.timeout(step, attempt)
+            started = time.monotonic()
+            try:
+                result = await action(timeout)
+            except TimeoutError as e:
+                last_error = e
+                self.timeouts += 1
+                inc("scraper_timeouts_total", step=step)
+                print(f"[RETRY] '{step}' timed out after {timeout}ms (attempt {attempt + 1}/{self.attempts})")
+                if attempt + 1 < self.attempts:
+                    self.retries += 1
+                    inc("scraper_retries_total", step=step)
+                    await asyncio.sleep(backoff_delay(attempt))
+                    if on_retry:
+                        await on_retry()
+                continue
+            self.latency.observe(step, (time.monotonic() - started) * 1000)
+            self.breaker.record_success()
+            return result
+        self.breaker.record_failure(step)
+        raise last_error
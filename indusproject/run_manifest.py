@@ -0,0 +1,79 @@
+"""
+Run manifest that makes PO scraping runs resumable.
+
+When a run has collected its PO list, the list is written to Redis with every
+PO marked pending. Each PO is stored as soon as its details are scraped and
+marked done (or failed) in the manifest; a run that finishes removes its
+manifest. If the process dies halfway, the next run of the same job finds the
+manifest, skips list collection and scrapes only the POs that are not done.
+
+    indus_po_run:<job_id>          string   JSON list of the run's PO entries
+    indus_po_run:<job_id>:state    hash     po_number -> pending | done | failed
+
+Both keys expire after RUN_MANIFEST_TTL seconds, so a stale run is not resumed.
+"""
+import os, json
+from dotenv import load_dotenv
+from .redis_connection import get_redis
+
+load_dotenv()
+
+RUN_MANIFEST_KEY = "indus_po_run:{}"
+RUN_MANIFEST_TTL = int(os.getenv("RUN_MANIFEST_TTL", "86400"))
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+
+WRITE_CHUNK_SIZE = 1000
+
+class RunManifest:
+    def __init__(self, job_id):
+        self.entries_key = RUN_MANIFEST_KEY.format(job_id)
+        self.state_key = f"{self.entries_key}:state"
+
+    def start(self, entries):
+        """Records a new run over `entries`, all pending, replacing any previous manifest."""
+        try:
+            pipe = get_redis().pipeline(transaction=True)
+            pipe.delete(self.entries_key, self.state_key)
+            pipe.set(self.entries_key, json.dumps(entries), ex=RUN_MANIFEST_TTL)
+            for start in range(0, len(entries), WRITE_CHUNK_SIZE):
+                chunk = entries[start:start + WRITE_CHUNK_SIZE]
+                pipe.hset(self.state_key, mapping={e["po_number"]: PENDING for e in chunk})
+            pipe.expire(self.state_key, RUN_MANIFEST_TTL)
+            pipe.execute()
+        except Exception as e:
+            print(f"[MANIFEST] Could not record run: {e}")
+
+    def resume(self):
+        """Entries of an interrupted run that are not done yet, in list order ([] when there is none)."""
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.get(self.entries_key)
+            pipe.hgetall(self.state_key)
+            raw, states = pipe.execute()
+        except Exception as e:
+            print(f"[MANIFEST] Could not load run manifest: {e}")
+            return []
+        if not raw:
+            return []
+        states = {k.decode(): v.decode() for k, v in states.items()}
+        return [entry for entry in json.loads(raw) if states.get(entry["po_number"]) != DONE]
+
+    def mark(self, po_numbers, state):
+        if not po_numbers:
+            return
+        try:
+            get_redis().hset(self.state_key, mapping={po_number: state for po_number in po_numbers})
+        except Exception as e:
+            print(f"[MANIFEST] Could not mark {len(po_numbers)} POs {state}: {e}")
+
+    def finish(self):
+        """Closes the run. Returns {state: count}; failed POs are picked up again by the next run's list."""
+        try:
+            redis_client = get_redis()
+            states = [v.decode() for v in redis_client.hvals(self.state_key)]
+            redis_client.delete(self.entries_key, self.state_key)
+        except Exception as e:
+            print(f"[MANIFEST] Could not close run: {e}")
+            return {}
+        return {state: states.count(state) for state in (DONE, FAILED, PENDING)}
@@ -1,11 +1,12 @@
 # indusproject/scheduler.py
 import os
 import json
-from redis import Redis
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
-from indusproject.scrapper import scrape_indus_po_data
+from indusproject.scrapper import scrape_indus_po_data, scrape_orders_combined
 from indusproject.status_scrapper import scrape_and_store_in_redis
+from indusproject.redis_connection import get_redis
+from indusproject.browser_pool import BROWSER_POOL_SIZE, start_browser_pool, stop_browser_pool
 from dotenv import load_dotenv
 import logging
 
@@ -19,13 +20,6 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# -------------------- Redis --------------------
-redis_client = Redis(
-    host=os.getenv("REDIS_HOST"),
-    port=int(os.getenv("REDIS_PORT")),
-    db=int(os.getenv("REDIS_DB"))
-)
-
 JOB_TIME_KEY = "scheduler_job_times"
 
 # -------------------- Scheduler --------------------
@@ -36,16 +30,24 @@ JOB_FUNCTIONS = {
     "scrape_and_store_in_redis": scrape_and_store_in_redis
 }
 
+# SCRAPER_COMBINED=true replaces both jobs with one crawl of the Orders list
+# that refreshes statuses and scrapes new or revised POs in the same pass
+if os.getenv("SCRAPER_COMBINED", "false").lower() == "true":
+    JOB_FUNCTIONS = {
+        "indus_combined_crawl": scrape_orders_combined
+    }
+
 # -------------------- Helper Functions --------------------
 def get_job_times():
     default_times = {
         "indus_po_scraper": {"hour": 16, "minute": 55},
-        "scrape_and_store_in_redis": {"hour": 15, "minute": 21}
+        "scrape_and_store_in_redis": {"hour": 15, "minute": 21},
+        "indus_combined_crawl": {"hour": 15, "minute": 21}
     }
     try:
-        data = redis_client.get(JOB_TIME_KEY)
+        data = get_redis().get(JOB_TIME_KEY)
         if data:
-            return json.loads(data)
+            return {**default_times, **json.loads(data)}
     except Exception as e:
         logging.exception(f"Error reading job times from Redis: {e}")
     return default_times
@@ -91,7 +93,7 @@ def update_job_schedule(job_id: str, hour: int, minute: int):
 
         # Update Redis
         job_times[job_id] = {"hour": hour, "minute": minute}
-        redis_client.set(JOB_TIME_KEY, json.dumps(job_times))
+        get_redis().set(JOB_TIME_KEY, json.dumps(job_times))
 
         # Update in-memory job if scheduler is running
         job = scheduler.get_job(job_id)
@@ -116,5 +118,16 @@ def update_job_schedule(job_id: str, hour: int, minute: int):
 # -------------------- Standalone --------------------
 if __name__ == "__main__":
     logging.info("Starting standalone scheduler...")
+    # Warm browsers shared by the scraping jobs (BROWSER_POOL_SIZE=0 disables the pool)
+    if BROWSER_POOL_SIZE > 0:
+        try:
+            start_browser_pool()
+            logging.info(f"Started browser pool with {BROWSER_POOL_SIZE} browsers")
+        except Exception as e:
+            # The jobs launch their own browsers when there is no pool
+            logging.exception(f"Could not start browser pool, continuing without it: {e}")
     add_jobs()
-    scheduler.start()  # Blocking call, systemd keeps service alive
+    try:
+        scheduler.start()  # Blocking call, systemd keeps service alive
+    finally:
+        stop_browser_pool()
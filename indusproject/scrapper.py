@@ -1,71 +1,151 @@
 import os, json, datetime
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright, TimeoutError
-from redis import Redis
-from .credentials import *
+from playwright.async_api import Error as PlaywrightError
+from .readiness import wait_for_ready, wait_for_network_settled, click_and_wait_for_response
+from .engine import ERPEngine
+from .resilience import CircuitOpenError
+from .metrics import span, inc
+from .browser_pool import run_scrape_job
+from .redis_connection import get_redis
+from .po_store import PO_REVISION_KEY, ingest_records, count_records
+from .status_store import write_statuses
+from .run_manifest import RunManifest, DONE, FAILED
+from .http_scraper import HttpScrapeError, fetch_list_tables, fetch_po_list, fetch_po_details
+from .table_extract import (
+    PO_DETAIL_ROWS_SELECTOR, extract_table, parse_line_items, parse_po_list, parse_orders_rows
+)
 
 load_dotenv()
 
-# ================= REDIS HELPERS =================
-def ConnectRedis():
-    try:
-        return Redis(
-            host=os.getenv("REDIS_HOST"),
-            port=int(os.getenv("REDIS_PORT")),
-            db=int(os.getenv("REDIS_DB"))
-        )
-    except Exception as e:
-        print("Error in connecting redis:", str(e))
-        return None
+# Detail scraping concurrency: SCRAPER_WORKERS is the default number of pages
+# working in parallel, SCRAPER_MAX_WORKERS (engine.MAX_CONCURRENCY) caps it.
+DEFAULT_DETAIL_WORKERS = int(os.getenv("SCRAPER_WORKERS", "1"))
+# Incremental runs skip POs whose (po_number, rev) is already stored
+SCRAPER_INCREMENTAL = os.getenv("SCRAPER_INCREMENTAL", "false").lower() == "true"
+# List entries of POs whose details failed (po_number -> entry JSON). Incremental
+# collection stops at the first known page, so it would never list them again.
+PO_RETRY_KEY = "indus_po_retry"
+# "browser" drives Chromium for every page, "http" replays requests with the session cookies
+SCRAPER_MODE = os.getenv("SCRAPER_MODE", "browser")
 
-def get_redis_data(key):
+# ================= REDIS HELPERS =================
+def filter_new_pos(entries):
+    """
+    Splits a page of list entries against the stored revisions (po_number -> rev).
+    Returns (new_or_revised_entries, reached_known) where reached_known means the
+    page contained an already-ingested PO, i.e. older pages need not be scanned.
+    """
+    if not entries:
+        return [], False
     try:
-        redis_client = ConnectRedis()
-        cached_data = redis_client.get(key)
-        return json.loads(cached_data) if cached_data else []
+        redis_client = get_redis()
+        known = redis_client.hmget(PO_REVISION_KEY, [e["po_number"] for e in entries])
     except Exception as e:
-        print(f"[CACHE ERROR] {e}")
-        return []
-
-def set_redis_data(key, data):
+        print(f"[WATERMARK ERROR] {e}")
+        return entries, False
+    new_entries = [
+        entry for entry, rev in zip(entries, known)
+        if rev is None or rev.decode() != entry["rev"]
+    ]
+    return new_entries, len(new_entries) < len(entries)
+
+def remember_failed(pos):
+    """Keeps the list entries of POs whose details could not be scraped for the next run."""
+    if not pos:
+        return
     try:
-        redis_client = ConnectRedis()
-        redis_client.set(key, json.dumps(data))
+        get_redis().hset(PO_RETRY_KEY, mapping={
+            po["po_number"]: json.dumps({k: po.get(k) for k in ("po_number", "rev", "order_date")})
+            for po in pos
+        })
     except Exception as e:
-        print(f"[REDIS SET ERROR] {e}")
+        print(f"[RETRY ERROR] {e}")
 
-def remove_duplicates_by_date(existing_data, new_data):
+def forget_failed(po_numbers):
+    if not po_numbers:
+        return
     try:
-        existing_dates = {
-            item.get("order_date") or item.get("creation_date")
-            for item in existing_data
-            if item.get("order_date") or item.get("creation_date")
-        }
-        unique_new_data = [
-            item for item in new_data
-            if (item.get("order_date") or item.get("creation_date")) not in existing_dates
-        ]
-        return unique_new_data
+        get_redis().hdel(PO_RETRY_KEY, *po_numbers)
     except Exception as e:
-        print(f"[DEDUPE ERROR] {e}")
-        return new_data
+        print(f"[RETRY ERROR] {e}")
 
-def store_po_data_with_deduplication(new_data):
+def add_failed_pos(po_numbers):
+    """
+    Appends the remembered failed POs that were not collected again, so an
+    incremental run retries them. Their entries carry no detail URL, so they
+    are opened through Advanced Search.
+    """
     try:
-        existing_po_data = get_redis_data("indus_po_data")
-        filtered_new_data = remove_duplicates_by_date(existing_po_data, new_data)
-
-        set_redis_data("indus_latest_data", filtered_new_data)
-        print(f"[✓] Stored {len(filtered_new_data)} new PO records to 'indus_latest_data'")
-
-        updated_po_data = existing_po_data + filtered_new_data
-        set_redis_data("indus_po_data", updated_po_data)
-        print(f"[✓] Updated 'indus_po_data' with total {len(updated_po_data)} records")
-
-        return filtered_new_data
+        remembered = get_redis().hgetall(PO_RETRY_KEY)
     except Exception as e:
-        print(f"[STORE ERROR] {e}")
+        print(f"[RETRY ERROR] {e}")
         return []
+    listed = {po["po_number"] for po in po_numbers}
+    retries = [new_po_entry(json.loads(raw)) for number, raw in remembered.items() if number.decode() not in listed]
+    if retries:
+        print(f"[INFO] Retrying {len(retries)} POs that failed in earlier runs")
+    po_numbers.extend(retries)
+    return retries
+
+# ================= CHECKPOINTS =================
+class Checkpoint:
+    """
+    Commits scraped POs to Redis as they finish and tracks the run in the job's
+    RunManifest, so an interrupted run resumes with the POs that are not done.
+    """
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.manifest = RunManifest(job_id)
+        self.changed = []
+        self.unchanged = 0
+
+    def resume(self):
+        pending = self.manifest.resume()
+        if pending:
+            print(f"[RESUME] Resuming interrupted run with {len(pending)} POs left")
+        return pending
+
+    def start(self, po_numbers):
+        self.manifest.start(po_numbers)
+
+    def commit(self, pos):
+        """
+        Stores the POs whose details were scraped, marks them done and the rest
+        failed. Failed POs are remembered for the next run (see add_failed_pos).
+        """
+        for po in pos:
+            # Detail URLs are tied to the scraping session, never persist them
+            po.pop("detail_url", None)
+        scraped = [po for po in pos if "project" in po]
+        failed = [po for po in pos if "project" not in po]
+        if failed:
+            inc("scraper_failed_pos_total", len(failed), job=self.job_id)
+        try:
+            with span("redis_write"):
+                summary = ingest_records(scraped) if scraped else None
+        except Exception as e:
+            print(f"[STORE ERROR] {e}")
+            inc("scraper_failed_pos_total", len(scraped), job=self.job_id)
+            remember_failed(pos)
+            self.manifest.mark([po["po_number"] for po in pos], FAILED)
+            return
+        if summary:
+            self.changed.extend(summary["inserted"] + summary["updated"])
+            self.unchanged += summary["unchanged"]
+        forget_failed([po["po_number"] for po in scraped])
+        remember_failed(failed)
+        self.manifest.mark([po["po_number"] for po in scraped], DONE)
+        self.manifest.mark([po["po_number"] for po in failed], FAILED)
+
+    def finish(self):
+        counts = self.manifest.finish()
+        if counts.get(FAILED):
+            # Not stored, so they show up as new in the next run's list
+            print(f"[WARNING] {counts[FAILED]} POs failed and will be retried by the next run")
+        print(
+            f"[✓] Stored {len(self.changed)} new or revised POs, {self.unchanged} unchanged, "
+            f"total {count_records()} records"
+        )
 
 # ================= DATA GROUPING =================
 def group_items_by_indus_id(items):
@@ -96,259 +176,380 @@ def group_items_by_indus_id(items):
         return []
 
 # ================= SCRAPING HELPERS =================
-def scrape_po_details(page, po_number, retries=3):
-    attempt = 0
-    while attempt < retries:
-        try:
-            if not wait_for_selector_retry(page, "tbody tr", timeout=60000, retries=retries):
-                raise TimeoutError(f"Table not loaded for PO {po_number}")
-
-            items, column_mapping = [], {}
-            rows = page.query_selector_all("tbody tr")
-
-            # Build column map
-            for row in rows:
-                headers = row.query_selector_all("th")
-                if headers:
-                    for idx, header in enumerate(headers):
-                        column_mapping[header.inner_text().strip()] = idx
-                    break
-
-            if not column_mapping:
-                headers = page.query_selector_all("thead th, table th")
-                for idx, header in enumerate(headers):
-                    column_mapping[header.inner_text().strip()] = idx
-
-            # Parse rows
-            for row in rows:
-                cells = row.query_selector_all("td")
-                if len(cells) < 10:
-                    continue
-                try:
-                    line = cells[column_mapping.get("Line", 2)].inner_text().strip()
-                    if not line or not line.isdigit():
-                        continue
-                    item_job = cells[column_mapping.get("Item/Job", 4)].inner_text().strip()
-                    description = cells[column_mapping.get("Description", 6)].inner_text().strip()
-                    qty = cells[column_mapping.get("Qty", 8)].inner_text().strip()
-                    price = cells[column_mapping.get("Price", 9)].inner_text().strip()
-                    indus_id = cells[column_mapping.get("Site ID", 25)].inner_text().strip() if 25 < len(cells) else ''
-                    project_id = cells[column_mapping.get("Project Name", 27)].inner_text().strip() if 27 < len(cells) else ''
-                    items.append({
-                        "line": line,
-                        "item_job": item_job,
-                        "description": description,
-                        "qty": qty,
-                        "price": price,
-                        "project_id": project_id,
-                        "indus_id": indus_id
-                    })
-                except Exception as e:
-                    print(f"[WARNING] Error parsing row in PO {po_number}: {e}")
-            return items
-        except TimeoutError:
-            attempt += 1
-            print(f"[TIMEOUT] Table not loaded for PO {po_number}. Retry {attempt}/{retries}")
-            page.reload()
-            page.wait_for_load_state("networkidle", timeout=30000)
-    print(f"[ERROR] Failed to load table for PO {po_number} after {retries} retries")
-    return []
-
-# ================= SAFE NAVIGATION =================
-def safe_click(page, selector, timeout=30000, wait_for_load=True, retries=3):
-    attempt = 0
-    while attempt < retries:
-        try:
-            page.wait_for_selector(selector, timeout=timeout)
-            page.click(selector)
-            if wait_for_load:
-                page.wait_for_load_state("networkidle", timeout=timeout)
-            return True
-        except TimeoutError:
-            attempt += 1
-            print(f"[WARNING] Timeout while waiting for {selector}. Retry {attempt}/{retries}")
-            if attempt >= retries:
-                return False
-        except Exception as e:
-            print(f"[ERROR] Failed to click {selector}: {e}")
-            return False
+async def scrape_po_details(engine, page, po_number):
+    """
+    Line items of the opened PO, None when its table never loaded. The page is
+    reloaded between attempts (see ERPEngine.wait_for).
+    """
+    async def reload():
+        print(f"[TIMEOUT] Table not loaded for PO {po_number}, reloading")
+        await page.reload()
+        await wait_for_network_settled(page, "detail")
+
+    if not await engine.wait_for(page, PO_DETAIL_ROWS_SELECTOR, "detail", on_retry=reload):
+        print(f"[ERROR] Failed to load table for PO {po_number}")
+        return None
+    with span("extraction"):
+        table = await extract_table(page, PO_DETAIL_ROWS_SELECTOR)
+    return parse_line_items(table, po_number)
+
+async def scrape_opened_po(engine, page, po):
+    """
+    Scrapes line items and creation date from the currently opened PO detail page.
+    Returns False, leaving the PO without 'project' (so it is not stored), when
+    the line items could not be scraped.
+    """
+    items = await scrape_po_details(engine, page, po['po_number'])
+    if items is None:
+        return False
+    po['project'] = group_items_by_indus_id(items)
+    po.pop('items', None)
+
+    # Scrape creation date
+    try:
+        date_elem = await page.query_selector("span[id*='PosOrderDateTime']")
+        if date_elem:
+            po["creation_date"] = (await date_elem.inner_text()).strip()
+    except Exception:
+        pass
+    return True
+
+async def scrape_po_via_search(engine, page, po):
+    """
+    Opens a PO through Advanced Search on the Orders tab and scrapes its details.
+    Works from any page of a logged-in session, so every engine worker page can use it.
+    """
+    # Reload Orders tab before each Advanced Search
+    print(f"[INFO] Reset Orders tab for Advanced Search for PO {po['po_number']}")
+    await engine.click(page, "a:has-text('Orders')", "orders")
+    await wait_for_ready(page, "button#SrchBtn[title='Advanced Search']", "orders")
+
+    # Click Advanced Search button
+    print("[INFO] Clicking Advanced Search button")
+    await engine.click(page, "button#SrchBtn[title='Advanced Search']", "search")
+    await wait_for_ready(page, "input#Value_0", "search")
+
+    # Enter PO number in search field
+    print(f"[INFO] Entering PO number {po['po_number']} in search field")
+    await page.fill("input#Value_0", po['po_number'])
+
+    # Click Go button
+    print("[INFO] Clicking Go button")
+    await click_and_wait_for_response(page, "button#customizeSubmitButton", "OA.jsp", "search")
+    # Wait for the PO results table
+    await engine.wait_for(page, "table#ResultRN\\.PosVpoPoList\\:Content tbody tr", "search")
+
+    # Click the PO link by inner text (handles dynamic IDs like N3, N5, etc.)
+    po_link_selector = f"a[id*='PosPoNumber']:has-text('{po['po_number']}')"
+    print(f"[INFO] Clicking PO link for {po['po_number']} in search results")
+
+    if not await engine.click(page, po_link_selector, "search"):
+        print(f"[WARNING] PO {po['po_number']} not found in Advanced Search results")
+        return False
+
+    await wait_for_ready(page, "span[id*='PosOrderDateTime']", "detail")
+    scraped = await scrape_opened_po(engine, page, po)
+
+    # Go back to PO summary table
+    await page.go_back()
+    await wait_for_network_settled(page, "orders")
+    if scraped:
+        print(f"[✓] Scraped details for PO {po['po_number']} via Advanced Search")
+    return scraped
+
+async def scrape_po_via_link(engine, page, po):
+    """
+    Opens a PO directly through the detail URL recorded during list collection.
+    Returns False when there is no link, it has expired (the ERP shows the login
+    page or no PO header) or the line items did not load, so the caller can fall
+    back to Advanced Search.
+    """
+    detail_url = po.get("detail_url")
+    if not detail_url:
+        return False
 
-def wait_for_selector_retry(page, selector, timeout=30000, retries=3):
-    attempt = 0
-    while attempt < retries:
+    try:
+        await page.goto(detail_url)
+    except PlaywrightError as e:
+        # Also covers navigation timeouts (TimeoutError is a subclass)
+        print(f"[WARN] Direct link for PO {po['po_number']} failed to load: {e}")
+        return False
+    if not await wait_for_ready(page, "span[id*='PosOrderDateTime'], input#usernameField", "detail"):
+        return False
+    if not await page.query_selector("span[id*='PosOrderDateTime']"):
+        print(f"[INFO] Direct link for PO {po['po_number']} expired")
+        return False
+
+    if not await scrape_opened_po(engine, page, po):
+        return False
+    print(f"[✓] Scraped details for PO {po['po_number']} via direct link")
+    return True
+
+async def scrape_po(engine, page, po):
+    """Scrapes one PO: direct link first, Advanced Search as the fallback."""
+    if await scrape_po_via_link(engine, page, po):
+        return True
+    return await scrape_po_via_search(engine, page, po)
+
+async def scrape_pending_details(engine, pending, workers, checkpoint):
+    """
+    Scrapes the details of `pending` POs as engine tasks, `workers` at a time.
+    Each task fills in its own PO dict and commits it through `checkpoint` as
+    soon as it is done.
+    """
+    total = len(pending)
+
+    async def job(page, idx, po):
+        print(f"[INFO] Scraping details for PO {idx + 1}/{total}: {po['po_number']}")
         try:
-            page.wait_for_selector(selector, timeout=timeout)
-            return True
-        except TimeoutError:
-            attempt += 1
-            print(f"[WARNING] Timeout waiting for {selector}. Retry {attempt}/{retries}")
-            if attempt >= retries:
-                return False
+            with span("detail"):
+                if not await scrape_po(engine, page, po):
+                    print(f"[ERROR] Could not scrape details for PO {po['po_number']}")
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            print(f"[ERROR] Error waiting for {selector}: {e}")
-            return False
+            print(f"[ERROR] Error scraping PO {po['po_number']}: {e}")
+            engine.resilience.breaker.record_failure(f"PO {po['po_number']}")
+        checkpoint.commit([po])
+
+    await engine.map_bounded(pending, job, workers)
 
-def scrape_indus_po_data(max_pages=3):
+# ================= PO LIST =================
+async def collect_po_numbers(engine, max_pages, incremental=False):
     """
-    Scrapes multiple pages of PO numbers first, then visits each PO to scrape details individually.
-    After first 25 POs, uses Advanced Search to fetch remaining POs one by one.
-    Ensures Orders tab is reloaded:
-      1) Once after PO collection
-      2) Before each Advanced Search for POs > 25
+    Walks up to `max_pages` pages of the Orders table in the browser and collects PO entries.
+    In incremental mode only new or revised POs are kept, and pagination stops at
+    the first page that contains an already-ingested PO.
     """
     po_numbers = []
-    result = []
+    async for current_page, table in engine.paginate(max_pages=max_pages):
+        entries = parse_po_list(table)
+        reached_known = False
+        if incremental:
+            entries, reached_known = filter_new_pos(entries)
+        po_numbers.extend(new_po_entry(entry) for entry in entries)
+
+        print(f"[INFO] Page {current_page}: Collected {len(entries)} of {len(table['rows'])} POs")
+        if reached_known:
+            print("[INFO] Reached already ingested POs, stopping pagination")
+            break
+    return po_numbers
+
+def new_po_entry(entry):
+    return {
+        **entry,
+        "scraped_at": datetime.datetime.now().isoformat(),
+        "items": []
+    }
+
+async def scrape_over_http(engine, max_pages, incremental=False):
+    """
+    HTTP-only mode: reuses the browser's cookies to fetch the Orders list and PO
+    detail pages with httpx. Returns (po_numbers, pending) where pending are the
+    POs whose detail page could not be scraped over HTTP, or (None, None) when
+    the Orders list itself could not be fetched or parsed.
+    """
+    def fetch(client, orders_url):
+        select = filter_new_pos if incremental else None
+        entries = fetch_po_list(client, orders_url, max_pages, select)
+        po_numbers = [new_po_entry(entry) for entry in entries]
+        print(f"[✓] Collected total {len(po_numbers)} PO numbers over HTTP")
+        return po_numbers, fetch_po_details(client, po_numbers)
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=False)
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto(ERP_LOGIN_URL)
-
-            # ---- Login ----
-            page.fill("input#usernameField", ERP_USERNAME)
-            page.fill("input#passwordField", ERP_PASSWORD)
-            safe_click(page, "button:has-text('Log In')")
-            page.wait_for_load_state("networkidle", timeout=30000)
-            print("[✓] Logged into ERP system")
-
-            # ---- Navigate to Orders ----
-            safe_click(page, "img[title='Expand']")
-            safe_click(page, "li >> text=Home Page")
-            safe_click(page, "a:has-text('Orders')")
-            print(f"[INFO] Starting PO number collection (up to {max_pages} pages)...")
-
-            # Step 1: Collect all PO numbers from pages
-            current_page = 1
-            while current_page <= max_pages:
-                page.wait_for_selector("span#ResultRN1 table tbody tr", timeout=30000)
-                rows = page.query_selector_all("span#ResultRN1 table tbody tr")
-
-                for row in rows:
-                    cells = row.query_selector_all("td")
-                    if len(cells) >= 6:
-                        po_number = cells[0].inner_text().strip()
-                        rev = cells[1].inner_text().strip()
-                        order_date = cells[5].inner_text().strip()
-
-                        if not po_number or any(x in po_number.lower() for x in ["next", "previous", "more"]):
-                            continue
-                        if not po_number[0].isalnum():
-                            continue
-
-                        po_numbers.append({
-                            "po_number": po_number,
-                            "rev": rev,
-                            "order_date": order_date,
-                            "scraped_at": datetime.datetime.now().isoformat(),
-                            "items": []
-                        })
-
-                print(f"[INFO] Page {current_page}: Collected {len(rows)} POs")
-
-                # Move to next page if available
-                next_button = page.query_selector("a.x49[title='Next 25'], a:has-text('Next 25')")
-                if next_button:
-                    safe_click(page, "a.x49[title='Next 25'], a:has-text('Next 25')")
-                    page.wait_for_timeout(2000)
-                    current_page += 1
-                else:
-                    break
-
-            print(f"[✓] Collected total {len(po_numbers)} PO numbers")
-
-            # ---- Reset Orders tab once before starting detail scraping ----
-            safe_click(page, "a:has-text('Orders')")
-            print("[INFO] Reset Orders tab before starting detail scraping, waiting 15 seconds...")
-            page.wait_for_timeout(15000)
+        po_numbers, pending = await engine.run_over_http(fetch)
+    except HttpScrapeError as e:
+        print(f"[HTTP] Falling back to browser scraping: {e}")
+        return None, None
+
+    group_http_details(po_numbers, pending)
+    return po_numbers, pending
+
+def group_http_details(po_numbers, pending):
+    """Groups the raw line items fetched over HTTP for every PO that is not pending."""
+    pending_ids = {id(po) for po in pending}
+    for po in po_numbers:
+        if id(po) not in pending_ids:
+            po['project'] = group_items_by_indus_id(po.pop('items'))
+
+# ================= COMBINED CRAWL =================
+def split_orders_page(table):
+    """
+    One Orders page of the combined crawl -> (status_records, queued_entries):
+    the status of every row, and the entries that are new or have a new revision.
+    """
+    entries = parse_orders_rows(table)
+    statuses = [
+        {"po_number": entry["po_number"], "status": entry["status"]}
+        for entry in entries if entry["status"] is not None
+    ]
+    changed, _ = filter_new_pos(entries)
+    queued = []
+    for entry in changed:
+        entry = dict(entry)
+        entry.pop("status")
+        queued.append(new_po_entry(entry))
+    return statuses, queued
+
+async def crawl_orders(engine, max_pages=None):
+    """Single browser pass over the Orders list. Returns (status_records, queued POs)."""
+    statuses, queued = [], []
+    async for current_page, table in engine.paginate(max_pages=max_pages):
+        page_statuses, page_queued = split_orders_page(table)
+        statuses.extend(page_statuses)
+        queued.extend(page_queued)
+        print(f"[INFO] Page {current_page}: {len(page_statuses)} statuses, {len(page_queued)} POs queued for details")
+    return statuses, queued
+
+async def crawl_orders_over_http(engine, max_pages=None):
+    """
+    HTTP counterpart of crawl_orders that also fetches the queued PO details.
+    Returns (status_records, queued, pending), or (None, None, None) when the
+    Orders list could not be fetched or parsed.
+    """
+    def fetch(client, orders_url):
+        statuses, queued = [], []
+        for table in fetch_list_tables(client, orders_url, max_pages):
+            page_statuses, page_queued = split_orders_page(table)
+            statuses.extend(page_statuses)
+            queued.extend(page_queued)
+        print(f"[✓] Crawled {len(statuses)} statuses over HTTP, {len(queued)} POs queued for details")
+        return statuses, queued, fetch_po_details(client, queued)
 
-            # Step 2: Visit each PO to scrape details
-            for idx, po in enumerate(po_numbers, 1):
-                print(f"[INFO] Scraping details for PO {idx}/{len(po_numbers)}: {po['po_number']}")
-
-                if idx <= 25:
-                    # ---- First 25 POs: normal navigation ----
-                    try:
-                        po_link_selector = f"span#ResultRN1 a:has-text('{po['po_number']}')"
-                        if safe_click(page, po_link_selector):
-                            items = scrape_po_details(page, po['po_number'])
-                            po['project'] = group_items_by_indus_id(items)
-                            del po['items']
-
-                            # Scrape creation date
-                            try:
-                                date_elem = page.query_selector("span[id*='PosOrderDateTime']")
-                                if date_elem:
-                                    po["creation_date"] = date_elem.inner_text().strip()
-                            except Exception:
-                                pass
-
-                            page.go_back()
-                            page.wait_for_load_state("networkidle", timeout=30000)
-                            print(f"[✓] Scraped details for PO {po['po_number']}")
-                    except Exception as e:
-                        print(f"[ERROR] Error scraping PO {po['po_number']}: {e}")
-                else:
-                    # ---- After 25 POs: use Advanced Search ----
-                    # ---- After 25 POs: use Advanced Search ----
-                    try:
-                        # Reload Orders tab before each Advanced Search
-                        print(f"[INFO] Reset Orders tab for Advanced Search for PO {po['po_number']}")
-                        safe_click(page, "a:has-text('Orders')")
-                        page.wait_for_timeout(15000)
-
-                        # Click Advanced Search button
-                        print("[INFO] Clicking Advanced Search button")
-                        safe_click(page, "button#SrchBtn[title='Advanced Search']")
-                        page.wait_for_timeout(3000)
-
-                        # Enter PO number in search field
-                        print(f"[INFO] Entering PO number {po['po_number']} in search field")
-                        page.fill("input#Value_0", po['po_number'])
-
-                        # Click Go button
-                        print("[INFO] Clicking Go button")
-                        safe_click(page, "button#customizeSubmitButton")
-                        # Wait for the PO results table
-                        page.wait_for_selector("table#ResultRN\\.PosVpoPoList\\:Content tbody tr", timeout=5000)
-
-                        # Click the PO link by inner text (handles dynamic IDs like N3, N5, etc.)
-                        po_link_selector = f"a[id*='PosPoNumber']:has-text('{po['po_number']}')"
-                        print(f"[INFO] Clicking PO link for {po['po_number']} in search results")
-
-                        if safe_click(page, po_link_selector):
-                            page.wait_for_load_state("networkidle", timeout=30000)
-
-                            items = scrape_po_details(page, po['po_number'])
-                            po['project'] = group_items_by_indus_id(items)
-                            del po['items']
-
-                            # Scrape creation date
-                            try:
-                                date_elem = page.query_selector("span[id*='PosOrderDateTime']")
-                                if date_elem:
-                                    po["creation_date"] = date_elem.inner_text().strip()
-                            except Exception:
-                                pass
-
-                            # Go back to PO summary table
-                            page.go_back()
-                            page.wait_for_load_state("networkidle", timeout=30000)
-                            print(f"[✓] Scraped details for PO {po['po_number']} via Advanced Search")
-                        else:
-                            print(f"[WARNING] PO {po['po_number']} not found in Advanced Search results")
-
-                    except Exception as e:
-                        print(f"[ERROR] Error scraping PO {po['po_number']} via Advanced Search: {e}")
-
-
-                result.append(po)
-
-            browser.close()
-            print(f"[✓] Scraping completed. Total POs: {len(result)}")
-            return store_po_data_with_deduplication(result)
+    try:
+        statuses, queued, pending = await engine.run_over_http(fetch)
+    except HttpScrapeError as e:
+        print(f"[HTTP] Falling back to browser crawl: {e}")
+        return None, None, None
+
+    group_http_details(queued, pending)
+    return statuses, queued, pending
+
+def store_statuses(statuses, complete):
+    """Replaces the status snapshot, but only with a crawl that covered every Orders page."""
+    if not complete:
+        print("[STATUS] Crawl was limited to some pages, keeping the previous status snapshot")
+        return
+    try:
+        with span("redis_write"):
+            stored, transitions = write_statuses(statuses)
+        print(f"[✓] Stored {stored} PO statuses, {len(transitions)} changed")
+    except Exception as e:
+        print(f"[STATUS ERROR] {e}")
 
+async def combined_crawl_job(max_pages, workers, mode, profile=None, engine_factory=ERPEngine):
+    """
+    One login and one pass over the Orders list for both datasets: the status of
+    every row goes to the status store, and only new or revised POs are queued
+    for detail scraping. An interrupted run is resumed without crawling the list
+    again, so the status snapshot is refreshed by the next complete run.
+    Returns the new or revised POs that were stored.
+    """
+    checkpoint = Checkpoint("indus_combined_crawl")
+    try:
+        async with engine_factory(profile) as engine:
+            await engine.open_orders()
+
+            pending = checkpoint.resume()
+            if not pending:
+                pending = None
+                if mode == "http":
+                    statuses, queued, pending = await crawl_orders_over_http(engine, max_pages)
+                if pending is None:
+                    statuses, queued = await crawl_orders(engine, max_pages)
+                    pending = queued
+
+                store_statuses(statuses, complete=max_pages is None)
+                checkpoint.start(queued)
+                commit_http_scraped(checkpoint, queued, pending)
+            await scrape_pending_details(engine, pending, workers, checkpoint)
+        checkpoint.finish()
+        print("[✓] Combined crawl completed")
     except Exception as e:
         print(f"[SCRAPER ERROR] {e}")
-        return store_po_data_with_deduplication(result) if result else []
+    return checkpoint.changed
+
+# ================= JOB =================
+def commit_http_scraped(checkpoint, po_numbers, pending):
+    """Commits the POs already scraped over HTTP, i.e. everything not left pending."""
+    pending_ids = {id(po) for po in pending}
+    scraped = [po for po in po_numbers if id(po) not in pending_ids]
+    if scraped:
+        checkpoint.commit(scraped)
+
+async def scrape_po_job(max_pages, workers, mode, incremental, profile=None, engine_factory=ERPEngine):
+    """
+    Runs one PO scrape on the engine. Every PO is stored as soon as its details
+    are scraped; an interrupted run is resumed from its manifest, skipping list
+    collection and the POs already done. Returns the new or revised POs stored.
+    `engine_factory(profile)` builds the engine (e.g. ERPEngine bound to another login URL).
+    """
+    checkpoint = Checkpoint("indus_po_scraper")
+    try:
+        async with engine_factory(profile) as engine:
+            await engine.open_orders()
+
+            pending = checkpoint.resume()
+            if not pending:
+                pending = None
+                if mode == "http":
+                    po_numbers, pending = await scrape_over_http(engine, max_pages, incremental)
+
+                if pending is None:
+                    # Step 1: Collect all PO numbers from pages
+                    print(f"[INFO] Starting PO number collection (up to {max_pages} pages)...")
+                    po_numbers = await collect_po_numbers(engine, max_pages, incremental)
+                    print(f"[✓] Collected total {len(po_numbers)} PO numbers")
+                    pending = po_numbers
+
+                if incremental:
+                    retries = add_failed_pos(po_numbers)
+                    if pending is not po_numbers:
+                        # Collected over HTTP: the browser scrapes the retries
+                        pending.extend(retries)
+
+                checkpoint.start(po_numbers)
+                commit_http_scraped(checkpoint, po_numbers, pending)
+
+            # Step 2: Visit each PO to scrape details
+            await scrape_pending_details(engine, pending, workers, checkpoint)
+        checkpoint.finish()
+        print("[✓] Scraping completed")
+    except Exception as e:
+        print(f"[SCRAPER ERROR] {e}")
+    return checkpoint.changed
+
+def scrape_indus_po_data(max_pages=3, workers=None, mode=None, incremental=None, profile=None,
+                         engine_factory=ERPEngine):
+    """
+    Scrapes multiple pages of PO numbers first, then visits each PO to scrape details individually.
+    Each PO's detail URL is recorded during collection and opened directly; Advanced
+    Search (with an Orders tab reload) is only used when that link has expired.
+    With workers > 1 (default SCRAPER_WORKERS, capped at SCRAPER_MAX_WORKERS) the
+    details are scraped by that many concurrent engine tasks sharing the login session.
+    With mode="http" (default SCRAPER_MODE) the browser only logs in; list and detail
+    pages are fetched over HTTP and the browser is the fallback for what fails.
+    With incremental=True (default SCRAPER_INCREMENTAL) only POs that are new or have
+    a new revision since the last run are scraped, see filter_new_pos.
+    POs are stored one by one as they are scraped, and a run that was interrupted
+    is resumed by the next call (see run_manifest.py).
+    `profile` (a browser_profile.ScrapeProfile) overrides the default headless,
+    resource-blocking browser setup for this job, and `engine_factory(profile)` the
+    engine (the offline benchmark points it at a local ERP stand-in).
+    """
+    workers = DEFAULT_DETAIL_WORKERS if workers is None else workers
+    mode = mode or SCRAPER_MODE
+    incremental = SCRAPER_INCREMENTAL if incremental is None else incremental
+    return run_scrape_job(scrape_po_job(max_pages, workers, mode, incremental, profile, engine_factory))
+
+def scrape_orders_combined(max_pages=None, workers=None, mode=None, profile=None, engine_factory=ERPEngine):
+    """
+    Combined crawl replacing separate runs of scrape_indus_po_data and the status
+    job: reads po_number, rev, order_date and status from every Orders page in a
+    single pass (columns 0, 1, 5 and 12), refreshes the status snapshot and
+    scrapes details only for new or revised POs. With max_pages set the crawl is
+    partial and the status snapshot is left as it is.
+    """
+    workers = DEFAULT_DETAIL_WORKERS if workers is None else workers
+    mode = mode or SCRAPER_MODE
+    return run_scrape_job(combined_crawl_job(max_pages, workers, mode, profile, engine_factory))
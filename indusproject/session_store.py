@@ -0,0 +1,48 @@
+"""
+Cached ERP login session shared by the scheduled scraping runs.
+
+After a successful login the browser context's storage_state (cookies and
+local storage) and the URL of the Orders page are stored in Redis with an
+expiry. The next run starts a context from that state and opens the Orders
+URL directly; it only logs in again when the ERP rejects the cached session.
+"""
+import os, json
+from dotenv import load_dotenv
+from .redis_connection import get_redis
+
+load_dotenv()
+
+SESSION_STATE_KEY = "erp_session_state"
+ORDERS_URL_KEY = "erp_orders_url"
+SESSION_TTL = int(os.getenv("ERP_SESSION_TTL", "3600"))
+
+# Present on the Orders page when the session was accepted / on the login page when it was not
+ORDERS_READY_SELECTOR = "span#ResultRN1 table tbody tr"
+LOGIN_FORM_SELECTOR = "input#usernameField"
+SESSION_CHECK_SELECTOR = f"{ORDERS_READY_SELECTOR}, {LOGIN_FORM_SELECTOR}"
+
+def load_session():
+    """Returns (storage_state, orders_url), or (None, None) when nothing usable is cached."""
+    try:
+        state, orders_url = get_redis().mget(SESSION_STATE_KEY, ORDERS_URL_KEY)
+        if state and orders_url:
+            return json.loads(state), orders_url.decode()
+    except Exception as e:
+        print(f"[SESSION] Could not load cached session: {e}")
+    return None, None
+
+def save_session(storage_state, orders_url):
+    try:
+        pipe = get_redis().pipeline()
+        pipe.set(SESSION_STATE_KEY, json.dumps(storage_state), ex=SESSION_TTL)
+        pipe.set(ORDERS_URL_KEY, orders_url, ex=SESSION_TTL)
+        pipe.execute()
+        print(f"[SESSION] Cached ERP session for {SESSION_TTL}s")
+    except Exception as e:
+        print(f"[SESSION] Could not cache session: {e}")
+
+def clear_session():
+    try:
+        get_redis().delete(SESSION_STATE_KEY, ORDERS_URL_KEY)
+    except Exception as e:
+        print(f"[SESSION] Could not clear cached session: {e}")
@@ -1,24 +1,19 @@
 # status_api.py
 
 import os
-import asyncio
-import json
-import redis
-from playwright.async_api import async_playwright
 from loguru import logger
 from .credentials import *
+from .engine import ERPEngine
+from .browser_profile import ScrapeProfile
+from .browser_pool import run_scrape_job
+from .metrics import span
+from .status_store import PO_STATUS_KEY, write_statuses
+from .table_extract import parse_status_rows
+from .http_scraper import HttpScrapeError, fetch_status_records
 
 # Setup logging
 logger.add("logs/app.log", rotation="5 MB", retention="7 days", level="INFO")
 
-# Redis setup
-REDIS_HOST = os.getenv("REDIS_HOST")
-REDIS_PORT = int(os.getenv("REDIS_PORT"))
-REDIS_DB = int(os.getenv("REDIS_DB"))
-REDIS_KEY = "Po_status"
-
-redis_client = redis.StrictRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
-
 
 class ScraperConfig:
     email =  ERP_USERNAME
@@ -27,86 +22,68 @@ class ScraperConfig:
     max_pages = 5
     page_load_timeout = 15000
     navigation_timeout = 20000
-    sleep_interval = 5.0
+    # "browser" or "http" (Orders pages fetched with the session cookies, browser as fallback)
+    mode = os.getenv("SCRAPER_MODE", "browser")
+    # Headless, resource-blocking browser (see browser_profile.py)
+    profile = ScrapeProfile()
 
 class POScraper:
+    """Status job on top of engine.ERPEngine: reads (po_number, status) from every Orders page."""
     def __init__(self, config):
         self.config = config
         self.records = []
 
-    async def _login(self, page):
-        await page.goto(self.config.base_url)
-        await asyncio.sleep(self.config.sleep_interval)
-        await page.fill('input[name="usernameField"]', self.config.email)
-        await page.fill('input[name="passwordField"]', self.config.password)
-        await page.press('input[name="passwordField"]', 'Enter')
-        await asyncio.sleep(self.config.sleep_interval)
-
-    async def _navigate_to_orders(self, page):
-        await page.click("img[title='Expand']")
-        await page.wait_for_selector("li >> text=Home Page", timeout=self.config.page_load_timeout)
-        await page.click("li >> text=Home Page")
-        await page.wait_for_selector("a:has-text('Orders')", timeout=self.config.page_load_timeout)
-        await page.click("a:has-text('Orders')")
-        await page.wait_for_selector("span#ResultRN1", timeout=self.config.navigation_timeout)
-
-    async def _scrape_page(self, page, page_number):
-        logger.info(f"📄 Scraping page {page_number}...")
-        await page.wait_for_selector("span#ResultRN1 table tbody tr", timeout=self.config.page_load_timeout)
-        rows = await page.query_selector_all("span#ResultRN1 table tbody tr")
-        for row in rows:
-            cells = await row.query_selector_all("td")
-            if len(cells) >= 13:
-                po_text = (await cells[0].inner_text()).strip()
-                if po_text and "Previous" not in po_text and "Next" not in po_text:
-                    self.records.append({
-                        "po_number": po_text,
-                        "status": (await cells[12].inner_text()).strip()
-                    })
-        logger.info(f"✅ Finished scraping page {page_number}, total records: {len(self.records)}")
-
+    def _engine(self):
+        return ERPEngine(
+            profile=self.config.profile,
+            timeouts={
+                "login": self.config.navigation_timeout,
+                "orders": self.config.navigation_timeout,
+                "pagination": self.config.page_load_timeout,
+            },
+            login_url=self.config.base_url,
+            username=self.config.email,
+            password=self.config.password,
+        )
+
+    async def _scrape_over_http(self, engine):
+        """Fetches every Orders page over HTTP. Returns False when the browser has to take over."""
+        try:
+            self.records = await engine.run_over_http(fetch_status_records)
+        except HttpScrapeError as e:
+            logger.warning(f"HTTP scrape failed, falling back to browser: {e}")
+            self.records = []
+            return False
+        logger.info(f"✅ Scraped {len(self.records)} records over HTTP")
+        return True
 
     async def scrape_data(self):
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-
-            await self._login(page)
-            await self._navigate_to_orders(page)
+        async with self._engine() as engine:
+            await engine.open_orders()
 
-            page_number = 1
-            while True:
-                await self._scrape_page(page, page_number)
+            if self.config.mode == "http" and await self._scrape_over_http(engine):
+                return {"status": "success", "records": self.records}
 
-                next_button = await page.query_selector("a:has-text('Next')")
-                if next_button:
-                    class_attr = await next_button.get_attribute("class") or ""
-                    if "disabled" not in class_attr.lower():
-                        logger.info(f"➡️ Moving to page {page_number + 1}")
-                        await next_button.click()
-                        await asyncio.sleep(self.config.sleep_interval)
-                        page_number += 1
-                    else:
-                        logger.info("⏹ No more pages, stopping scrape.")
-                        break
-                else:
-                    logger.info("⏹ Next button not found, stopping scrape.")
-                    break
+            async for page_number, table in engine.paginate():
+                logger.info(f"📄 Scraping page {page_number}...")
+                self.records.extend(parse_status_rows(table))
+                logger.info(f"✅ Finished scraping page {page_number}, total records: {len(self.records)}")
+            logger.info("⏹ No more pages, stopping scrape.")
 
-            await browser.close()
             return {"status": "success", "records": self.records}
 
 
 
 # 🟢 Scheduled job to run every 15 minutes
-def scrape_and_store_in_redis():
+def scrape_and_store_in_redis(config=None):
     try:
-        config = ScraperConfig()
+        config = config or ScraperConfig()
         scraper = POScraper(config)
-        result = asyncio.run(scraper.scrape_data())
+        result = run_scrape_job(scraper.scrape_data())
         if result.get("status") == "success":
-            redis_client.set(REDIS_KEY, json.dumps(result["records"]))
-            logger.info(f"Scraped data stored in Redis under key '{REDIS_KEY}'")
+            with span("redis_write"):
+                stored, transitions = write_statuses(result["records"])
+            logger.info(f"Stored {stored} PO statuses in Redis under key '{PO_STATUS_KEY}', {len(transitions)} changed")
         else:
             logger.error(f"Scraper returned error: {result}")
     except Exception as e:
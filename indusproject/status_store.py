@@ -0,0 +1,117 @@
+"""
+PO status snapshot stored as a Redis hash (po_number -> status).
+
+The status scraper replaces the whole snapshot atomically (written to a
+temporary key, then RENAMEd over the live one), and /api/po-status/ answers
+with a single HMGET for just the requested POs, so its cost depends on the
+request size rather than the total PO count.
+
+Every new snapshot is diffed against the previous one. The latest transition
+of each PO is kept in a hash, indexed by change time in a sorted set, so
+`read_status_changes` can answer "which POs moved since T" without a scan:
+
+    Po_status_changes        zset    po_number scored by time of its last status change
+    Po_status_transitions    hash    po_number -> {"from", "to", "changed_at"} JSON
+
+The legacy `Po_status` JSON blob can be converted once with:
+
+    python -m indusproject.status_store migrate
+"""
+import sys, json, time
+from .redis_connection import get_redis
+from .po_store import zpage
+from .events import queue_status_event
+
+PO_STATUS_KEY = "Po_status_by_po"
+PO_STATUS_TMP_KEY = "Po_status_by_po:tmp"
+# Bumped on every snapshot write (API response cache / ETag)
+PO_STATUS_VERSION_KEY = "Po_status_by_po:version"
+LEGACY_STATUS_KEY = "Po_status"
+STATUS_CHANGES_KEY = "Po_status_changes"
+STATUS_TRANSITIONS_KEY = "Po_status_transitions"
+
+WRITE_CHUNK_SIZE = 1000
+
+def diff_statuses(previous, current, changed_at):
+    """Transitions between two snapshots (po_number -> status). POs absent from `previous` count only if it is non-empty."""
+    transitions = []
+    for po_number, status in current.items():
+        old = previous.get(po_number)
+        if old != status and (old is not None or previous):
+            transitions.append({"po_number": po_number, "from": old, "to": status, "changed_at": changed_at})
+    return transitions
+
+def write_statuses(records):
+    """
+    Replaces the status snapshot with `records` ([{"po_number", "status"}, ...]) and
+    records the transitions against the previous snapshot. An empty scrape keeps the
+    previous snapshot. Returns (stored_count, transitions).
+    """
+    mapping = {r["po_number"]: r["status"] for r in records if r.get("po_number")}
+    if not mapping:
+        print("[STATUS] Empty status snapshot, keeping the previous one")
+        return 0, []
+
+    redis_client = get_redis()
+    previous = {k.decode(): v.decode() for k, v in redis_client.hgetall(PO_STATUS_KEY).items()}
+    changed_at = time.time()
+    transitions = diff_statuses(previous, mapping, changed_at)
+
+    items = list(mapping.items())
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(PO_STATUS_TMP_KEY)
+    for start in range(0, len(items), WRITE_CHUNK_SIZE):
+        pipe.hset(PO_STATUS_TMP_KEY, mapping=dict(items[start:start + WRITE_CHUNK_SIZE]))
+    pipe.rename(PO_STATUS_TMP_KEY, PO_STATUS_KEY)
+    for start in range(0, len(transitions), WRITE_CHUNK_SIZE):
+        chunk = transitions[start:start + WRITE_CHUNK_SIZE]
+        pipe.zadd(STATUS_CHANGES_KEY, {t["po_number"]: changed_at for t in chunk})
+        pipe.hset(STATUS_TRANSITIONS_KEY, mapping={t["po_number"]: json.dumps(t) for t in chunk})
+        for transition in chunk:
+            queue_status_event(pipe, transition)
+    pipe.incr(PO_STATUS_VERSION_KEY)
+    pipe.execute()
+    return len(mapping), transitions
+
+def read_status_changes(since=None, cursor=None, limit=100):
+    """
+    Latest transition of each PO whose status changed at or after `since` (epoch
+    seconds), oldest change first. Returns (transitions, next_cursor).
+    """
+    po_numbers, next_cursor = zpage(STATUS_CHANGES_KEY, since, None, cursor, limit)
+    if not po_numbers:
+        return [], None
+    raw = get_redis().hmget(STATUS_TRANSITIONS_KEY, po_numbers)
+    return [json.loads(r) for r in raw if r], next_cursor
+
+def get_statuses(po_numbers):
+    """
+    Statuses for `po_numbers` in the same order (None for unknown POs), or None
+    when no snapshot has been stored yet. One round trip.
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.exists(PO_STATUS_KEY)
+    pipe.hmget(PO_STATUS_KEY, po_numbers)
+    exists, statuses = pipe.execute()
+    if not exists:
+        return None
+    return [status.decode() if status is not None else None for status in statuses]
+
+def migrate_legacy_blob():
+    """Loads the legacy `Po_status` JSON blob into the hash and removes the blob."""
+    redis_client = get_redis()
+    raw = redis_client.get(LEGACY_STATUS_KEY)
+    if not raw:
+        print(f"[MIGRATE] No '{LEGACY_STATUS_KEY}' blob to migrate")
+        return 0
+    migrated, _ = write_statuses([r for r in json.loads(raw) if isinstance(r, dict)])
+    redis_client.delete(LEGACY_STATUS_KEY)
+    print(f"[MIGRATE] Migrated {migrated} PO statuses")
+    return migrated
+
+# -------------------- Standalone --------------------
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        migrate_legacy_blob()
+    else:
+        print("Usage: python -m indusproject.status_store migrate")
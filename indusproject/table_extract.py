@@ -0,0 +1,159 @@
+"""
+Single-round-trip table extraction shared by both ERP scrapers.
+
+`extract_table` pulls the header texts and every row's cell texts out of the
+page with one `page.evaluate` call, instead of one `inner_text()` IPC round
+trip per cell. Alongside the texts it returns the first link of every row, which
+is how PO deep links are recorded during list collection. It returns the
+evaluate result directly, so async callers await it.
+
+The header -> column index mapping is built once per distinct header layout
+and cached.
+"""
+from functools import lru_cache
+
+PO_DETAIL_ROWS_SELECTOR = "tbody tr"
+
+# Default column positions used when a header is missing from the layout
+DETAIL_COLUMNS = {
+    "line": ("Line", 2),
+    "item_job": ("Item/Job", 4),
+    "description": ("Description", 6),
+    "qty": ("Qty", 8),
+    "price": ("Price", 9),
+    "indus_id": ("Site ID", 25),
+    "project_id": ("Project Name", 27),
+}
+
+_TABLE_JS = """
+(selector) => {
+    const text = (el) => el.innerText.trim();
+    const rows = Array.from(document.querySelectorAll(selector));
+    let headers = [];
+    for (const row of rows) {
+        const ths = row.querySelectorAll('th');
+        if (ths.length) {
+            headers = Array.from(ths, text);
+            break;
+        }
+    }
+    if (!headers.length) {
+        headers = Array.from(document.querySelectorAll('thead th, table th'), text);
+    }
+    return {
+        headers: headers,
+        rows: rows.map((row) => Array.from(row.querySelectorAll('td'), text)),
+        links: rows.map((row) => {
+            const a = row.querySelector('a[href]');
+            return a ? a.href : null;
+        }),
+    };
+}
+"""
+
+def extract_table(page, selector):
+    """
+    Returns {"headers": [...], "rows": [[cell, ...], ...], "links": [href or None, ...]}
+    for the rows matching `selector`.
+    """
+    return page.evaluate(_TABLE_JS, selector)
+
+@lru_cache(maxsize=32)
+def _column_mapping(headers):
+    mapping = {}
+    for idx, header in enumerate(headers):
+        mapping[header] = idx
+    return mapping
+
+def column_mapping(headers):
+    """Header text -> column index, cached per header layout. Treat the result as read-only."""
+    return _column_mapping(tuple(headers or ()))
+
+def _cell(cells, idx):
+    return cells[idx] if idx < len(cells) else ''
+
+def parse_line_items(table, po_number=""):
+    """Parses PO detail line items out of an extracted table."""
+    mapping = column_mapping(table.get("headers"))
+    columns = {field: mapping.get(header, default) for field, (header, default) in DETAIL_COLUMNS.items()}
+
+    items = []
+    for cells in table.get("rows", []):
+        if len(cells) < 10:
+            continue
+        try:
+            line = _cell(cells, columns["line"])
+            if not line or not line.isdigit():
+                continue
+            items.append({
+                "line": line,
+                "item_job": _cell(cells, columns["item_job"]),
+                "description": _cell(cells, columns["description"]),
+                "qty": _cell(cells, columns["qty"]),
+                "price": _cell(cells, columns["price"]),
+                "project_id": _cell(cells, columns["project_id"]),
+                "indus_id": _cell(cells, columns["indus_id"])
+            })
+        except Exception as e:
+            print(f"[WARNING] Error parsing row in PO {po_number}: {e}")
+    return items
+
+def _is_po_number(po_number):
+    if not po_number or any(x in po_number.lower() for x in ["next", "previous", "more"]):
+        return False
+    return po_number[0].isalnum()
+
+def _detail_url(href):
+    # javascript: links only work by clicking, they cannot be navigated to
+    if href and href.startswith(("http://", "https://")):
+        return href
+    return None
+
+def _po_rows(table):
+    """(cells, href) of the Orders table rows that carry a PO."""
+    rows = table.get("rows", [])
+    links = table.get("links") or [None] * len(rows)
+    return [
+        (cells, href) for cells, href in zip(rows, links)
+        if len(cells) >= 6 and _is_po_number(cells[0])
+    ]
+
+def parse_po_list(table):
+    """Parses (po_number, rev, order_date, detail_url) rows out of the Orders results table."""
+    return [
+        {
+            "po_number": cells[0],
+            "rev": cells[1],
+            "order_date": cells[5],
+            "detail_url": _detail_url(href),
+        }
+        for cells, href in _po_rows(table)
+    ]
+
+def parse_orders_rows(table):
+    """
+    Parses (po_number, rev, order_date, status, detail_url) rows out of the Orders
+    results table in one pass, for the combined crawl. `status` is None for rows
+    too short to carry the status column.
+    """
+    return [
+        {
+            "po_number": cells[0],
+            "rev": cells[1],
+            "order_date": cells[5],
+            "status": cells[12] if len(cells) >= 13 else None,
+            "detail_url": _detail_url(href),
+        }
+        for cells, href in _po_rows(table)
+    ]
+
+def parse_status_rows(table):
+    """Parses (po_number, status) rows out of the Orders results table."""
+    records = []
+    for cells in table.get("rows", []):
+        if len(cells) < 13:
+            continue
+        po_text = cells[0]
+        if po_text and "Previous" not in po_text and "Next" not in po_text:
+            records.append({"po_number": po_text, "status": cells[12]})
+    return records